@@ -1,5 +1,7 @@
 # Part B: Implementation (Lexer, Parse Table, Parse tree)
 
+import re
+import sys
 from enum import Enum, auto
 
 
@@ -19,14 +21,132 @@ class TokenType(Enum):
 
 
 class Token:
-    def __init__(self, ttype: 'TokenType', value=None):
+    def __init__(self, ttype: 'TokenType', value=None, sym=None):
         self.type = ttype 
         self.value = value 
+        # symbol id when the token was made with a SymbolTable (IDENT and NUMBER only)
+        self.sym = sym
 
     def __repr__(self):
         return self.type.name if self.value is None else f"{self.type.name}({self.value})"
 
 
+#a NUMBER literal that is only converted to an int when its value is first read,
+#until then it just remembers where its digits are in the source
+class LazyNumberToken(Token):
+    def __init__(self, src: str, start: int, end: int):
+        self.type = TokenType.NUMBER
+        self.sym = None
+        self.src = src
+        self.start = start
+        self.end = end
+        self._value = None
+
+    @property
+    def value(self):
+        if self._value is None:
+            self._value = _digits_to_int(self.src[self.start:self.end])
+        return self._value
+
+    def __len__(self):
+        return self.end - self.start
+
+    #digits as int would print them, shortened when python could not print them
+    def display(self) -> str:
+        text = self.src[self.start:self.end].lstrip('0') or '0'
+        if len(text) > _INT_STR_DIGITS:
+            return f"{text[:20]}...<{len(text)} digits>"
+        return text
+
+    def __repr__(self):
+        return f"NUMBER(<{len(self)} digits>)"
+
+
+#python refuses int <-> str conversions above this many digits (3.11+), longer
+#literals are converted in chunks below the limit
+_INT_STR_DIGITS = 4300
+_INT_CHUNK_DIGITS = 4000
+
+#turns a digit string of any length into an int, splitting it in half until the
+#pieces are short enough for int(), this also avoids int()'s quadratic cost on
+#long strings
+def _digits_to_int(text: str, powers=None) -> int:
+    chunk = _INT_CHUNK_DIGITS
+    limit = getattr(sys, "get_int_max_str_digits", lambda: 0)()
+    if limit:
+        chunk = min(chunk, limit)
+    if len(text) <= chunk:
+        return int(text)
+
+    if powers is None:
+        powers = {}
+    low_digits = len(text) // 2
+    power = powers.get(low_digits)
+    if power is None:
+        power = powers[low_digits] = 10 ** low_digits
+    high = _digits_to_int(text[:-low_digits], powers)
+    low = _digits_to_int(text[-low_digits:], powers)
+    return high * power + low
+
+
+#policy for NUMBER literals used by Lexer.tokenize
+#  max_digits:   longer literals raise ValueError("Number Literal Too Long"), None means no limit
+#  eager_digits: literals up to this length are converted with int() straight away (fast path),
+#                longer ones become LazyNumberToken and are converted when the value is needed,
+#                capped at what a single int() call is allowed to convert
+class NumberPolicy:
+    def __init__(self, max_digits=_INT_STR_DIGITS, eager_digits=32):
+        self.max_digits = max_digits
+        limit = getattr(sys, "get_int_max_str_digits", lambda: 0)()
+        self.eager_digits = min(eager_digits, _INT_CHUNK_DIGITS, limit or _INT_CHUNK_DIGITS)
+        #stops matching one digit past the limit so a huge run is rejected
+        #without scanning all of it
+        if max_digits is None:
+            self.pattern = re.compile(r'[0-9]+')
+        else:
+            self.pattern = re.compile(r'[0-9]{1,%d}' % (max_digits + 1))
+
+
+#the default only accepts literals python can still print (4300 digits)
+DEFAULT_NUMBER_POLICY = NumberPolicy()
+
+
+#symbol table shared between calls to Lexer.tokenize so every distinct identifier
+#or number literal is stored once, tokens get a small integer id (token.sym) and
+#their value is the one shared object from the table (so trees share it as well)
+#max_symbols bounds the table for long running processes, once it is full new
+#text is not added and tokenize makes ordinary tokens (sym None) for it
+class SymbolTable:
+    def __init__(self, max_symbols=None):
+        self.max_symbols = max_symbols
+        self.ids = {}      # source text -> id
+        self.texts = []    # id -> source text
+        self.values = []   # id -> value (the text for IDENT, the int for NUMBER)
+
+    def __len__(self):
+        return len(self.values)
+
+    #returns the id for text, adding it the first time it is seen, convert
+    #turns the text into the stored value (e.g. int for NUMBER literals),
+    #returns None for new text when the table is full
+    def intern(self, text: str, convert=None):
+        sym = self.ids.get(text)
+        if sym is None:
+            sym = len(self.values)
+            if self.max_symbols is not None and sym >= self.max_symbols:
+                return None
+            self.ids[text] = sym
+            self.texts.append(text)
+            self.values.append(text if convert is None else convert(text))
+        return sym
+
+    def text(self, sym: int) -> str:
+        return self.texts[sym]
+
+    def value(self, sym: int):
+        return self.values[sym]
+
+
 #this section maps specific UNICODE characters to token types to recognise
 #single -character symbols quickly
 SINGLE = {
@@ -50,9 +170,16 @@ def _is_ascii_digit(ch):
 class Lexer:
     @staticmethod
     #loops through input string character by characer to decide what each part represents and collects tokens
-    def tokenize(src: str):
+    #if a SymbolTable is given, IDENT and NUMBER tokens are interned in it
+    #numbers is the NumberPolicy for NUMBER literals (DEFAULT_NUMBER_POLICY if not given)
+    def tokenize(src: str, symbols: 'SymbolTable' = None, numbers: 'NumberPolicy' = None):
         i, n = 0, len(src)
         out = []
+        if numbers is None:
+            numbers = DEFAULT_NUMBER_POLICY
+        max_digits = numbers.max_digits
+        eager_digits = numbers.eager_digits
+        match_digits = numbers.pattern.match
 
         while i < n:
             ch = src[i]
@@ -72,10 +199,22 @@ class Lexer:
         # NUMBER: [0-9]
             if _is_ascii_digit(ch):
                 start = i
-                i += 1
-                while i < n and _is_ascii_digit(src[i]):
-                    i += 1
-                out.append(Token(TokenType.NUMBER, int(src[start:i])))
+                i = match_digits(src, i).end()
+                if max_digits is not None and i - start > max_digits:
+                    raise ValueError("Number Literal Too Long")
+                if i - start > eager_digits:
+                    #long literal: keep the span, convert later (these are not interned)
+                    out.append(LazyNumberToken(src, start, i))
+                elif symbols is None:
+                    out.append(Token(TokenType.NUMBER, int(src[start:i])))
+                else:
+                    #int() only runs the first time a literal is seen
+                    text = src[start:i]
+                    sym = symbols.intern(text, int)
+                    if sym is None:  # table is full
+                        out.append(Token(TokenType.NUMBER, int(text)))
+                    else:
+                        out.append(Token(TokenType.NUMBER, symbols.values[sym], sym))
                 continue
 
             # IDENTIFIERS: [A-Za-z][A-Za-z0-9]*
@@ -84,7 +223,16 @@ class Lexer:
                 i += 1
                 while i < n and (_is_ascii_letter(src[i]) or _is_ascii_digit(src[i])):
                     i += 1
-                out.append(Token(TokenType.IDENT, src[start:i]))
+                if symbols is None:
+                    out.append(Token(TokenType.IDENT, src[start:i]))
+                else:
+                    #the slice is dropped, the token keeps the shared copy from the table
+                    text = src[start:i]
+                    sym = symbols.intern(text)
+                    if sym is None:  # table is full
+                        out.append(Token(TokenType.IDENT, text))
+                    else:
+                        out.append(Token(TokenType.IDENT, symbols.values[sym], sym))
                 continue
 
             if ch == '-' or ch == 'x': 
@@ -159,6 +307,9 @@ def _error_token(token_check: 'Token') -> str:
     # These are token that are readable to work with error messages
     if token_check.type == TokenType.IDENT:
         return f"IDENT({token_check.value})"
+    if isinstance(token_check, LazyNumberToken):
+        # no need to convert a long literal just to print it
+        return f"NUMBER({token_check.display()})"
     if token_check.type == TokenType.NUMBER:
         return f"NUMBER({token_check.value})"
     return token_check.type.name
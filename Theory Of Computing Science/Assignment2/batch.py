@@ -0,0 +1,117 @@
+# Shared helpers for running the parser over many sources at once
+#
+# Used by the server and anything else that needs "source in, tree or error
+# out" without caring about exceptions.
+#  - parse_one turns a single source string into a result dict
+#  - parse_batch does the same for a list of sources (one call per worker
+#    round trip, which is what makes batching worth it)
+#  - parse_batch_encoded returns ready-to-send JSON instead of dicts (encode_tree
+#    does not recurse, so trees of any depth can be sent back)
+#  - decode_request/format_response handle the {"id": ..., "src": ...} request
+#    format, server.py and cli.py answer through them so their output matches
+
+
+import json
+
+from Assignment2 import Lexer, parse
+
+
+# Formats an exception the same way tests.py records it in its JSON output
+def format_error(e: Exception) -> str:
+    return f"{type(e).__name__}: {e}"
+
+
+# Runs the lexer and parser on one source, a lexer ValueError or parser
+# SyntaxError is reported in the "error" field instead of being raised
+def parse_one(src: str) -> dict:
+    try:
+        tree = parse(Lexer.tokenize(src))
+    except (SyntaxError, ValueError) as e:
+        return {"tree": None, "error": format_error(e)}
+    return {"tree": tree, "error": None}
+
+
+# Runs parse_one over a list of sources, results come back in the same order
+def parse_batch(sources: list[str]) -> list[dict]:
+    return [parse_one(src) for src in sources]
+
+
+# markers pushed on the encoder stack between tree values
+_CLOSE = object()
+_COMMA = object()
+
+
+# Encodes a parse tree as JSON with an explicit stack, json.dumps recurses once
+# per nesting level and fails on trees deeper than the recursion limit, which
+# parse builds without any trouble. Output matches json.dumps(tree, ensure_ascii=False)
+def encode_tree(tree) -> str:
+    parts = []
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        if node is _CLOSE:
+            parts.append("]")
+        elif node is _COMMA:
+            parts.append(", ")
+        elif isinstance(node, list):
+            parts.append("[")
+            stack.append(_CLOSE)
+            for index in range(len(node) - 1, -1, -1):
+                stack.append(node[index])
+                if index:
+                    stack.append(_COMMA)
+        elif isinstance(node, str):
+            parts.append(json.dumps(node, ensure_ascii=False))
+        elif isinstance(node, int) and not isinstance(node, bool):
+            parts.append(str(node))
+        elif node is None:
+            parts.append("null")
+        else:
+            raise ValueError(f"Cannot encode tree value {node!r}")
+    return "".join(parts)
+
+
+# Encodes a result dict as one JSON object (no trailing newline), a tree that
+# still cannot be encoded (e.g. an int too long to print) becomes an error
+def encode_result(result: dict) -> str:
+    try:
+        tree = encode_tree(result["tree"])
+    except ValueError as e:
+        tree, result = "null", {"error": format_error(e)}
+    return f'{{"tree": {tree}, "error": {json.dumps(result["error"], ensure_ascii=False)}}}'
+
+
+# Same as parse_batch but returns already encoded JSON objects, this is what
+# worker processes run so the tree never has to be pickled back to the parent
+def parse_batch_encoded(sources: list[str]) -> list[str]:
+    return [encode_result(parse_one(src)) for src in sources]
+
+
+# Decodes one JSONL request line, either a bare JSON string or an object
+# {"id": <anything>, "src": <string>}, returns (id, src, error) where error is
+# an already encoded result when the line is not a valid request
+def decode_request(line):
+    try:
+        request = json.loads(line)
+    except (ValueError, RecursionError) as e:
+        return None, None, encode_result({"tree": None, "error": f"ValueError: Bad Request: {e}"})
+    if isinstance(request, str):
+        return None, request, None
+    if not isinstance(request, dict) or not isinstance(request.get("src"), str):
+        return None, None, encode_result({"tree": None, "error": 'ValueError: Bad Request: expected {"src": <string>}'})
+    return request.get("id"), request["src"], None
+
+
+# Puts an "id" field in front of an encoded result without decoding it again,
+# the id is ASCII-escaped because a valid request can carry a lone surrogate
+# ("\ud800") that could not be written out as UTF-8
+def add_id(encoded: str, req_id) -> str:
+    return f'{{"id": {json.dumps(req_id)}, {encoded[1:]}'
+
+
+# Builds one response line (no trailing newline), the "id" field is only present
+# when the request had one, e.g. a line that was too long or not JSON has none
+def format_response(encoded: str, req_id=None) -> str:
+    if req_id is None:
+        return encoded
+    return add_id(encoded, req_id)
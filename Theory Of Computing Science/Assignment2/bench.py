@@ -0,0 +1,301 @@
+# Performance benchmarks for Lexer.tokenize and parse
+#
+# What this file does:
+#  - generates synthetic inputs (realistic and adversarial) at several sizes
+#  - measures tokens/sec for the lexer, trees/sec for the parser and peak memory
+#    (long NUMBER literals are converted lazily, that cost shows up in trees/sec)
+#  - measures decoded/sec for loading the same tree from the treecodec format,
+#    which is what a TreeCache hit costs instead of tokenize + parse
+#  - prints a scaling curve per workload (the "slope" column is how time grows
+#    with size, 1.0 is linear, 2.0 is quadratic)
+#  - can save the numbers as a baseline and later compare against it, exiting
+#    with status 1 when something got slower by more than --threshold
+#
+# Examples:
+#   python3 bench.py
+#   python3 bench.py --quick --save bench_baseline.json
+#   python3 bench.py --quick --compare bench_baseline.json --threshold 0.2
+#   python3 bench.py --quick --intern     (tokenize with a shared SymbolTable)
+#   python3 bench.py --workloads --digit-runs   (only the multi-megabyte NUMBER runs)
+
+
+import argparse
+import json
+import math
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+import treecodec
+from Assignment2 import Lexer, NumberPolicy, SymbolTable, parse
+
+# -----------------------
+# Workload generators
+#
+# Each generator takes a size and returns a source string, the meaning of the
+# size depends on the workload (number of sub expressions, nesting depth, ...).
+# A fixed seed keeps the inputs identical between runs so results compare.
+
+# Unicode reference: × (U+00D7), − (U+2212), λ (U+03BB), ≜ (U+225C)
+_TEMPLATES = [
+    "(+ {a} {b})",
+    "(× {a} (+ {b} {n}))",
+    "(? (= {a} {n}) {b} {n})",
+    "((λ {a} (+ {a} {n})) {b})",
+    "(≜ {a} {n} (× {a} {b}))",
+    "(− {a} {n})",
+]
+
+
+def gen_realistic(size: int, seed: int = 0) -> str:
+    # an application of `size` small expressions like the ones in tests.py
+    rng = random.Random(seed)
+    names = ["x", "y", "acc", "total", "n1", "value", "f", "g"]
+    parts = []
+    for _ in range(size):
+        template = rng.choice(_TEMPLATES)
+        parts.append(template.format(a=rng.choice(names), b=rng.choice(names), n=rng.randint(0, 1000)))
+    return "(f " + " ".join(parts) + ")"
+
+
+def gen_deep(size: int) -> str:
+    # `size` levels of nested PLUS
+    return "(+ 1 " * size + "1" + ")" * size
+
+
+def gen_wide_apply(size: int) -> str:
+    # one APPLY node with `size` arguments
+    return "(f " + " ".join(f"x{i}" for i in range(size)) + ")"
+
+
+def gen_long_ident(size: int) -> str:
+    # identifiers `size` characters long
+    name = ("abcXYZ" * (size // 6 + 1))[:size]
+    return f"(λ {name} (+ {name} 1))"
+
+
+def gen_huge_number(size: int) -> str:
+    # NUMBER literals with `size` digits
+    digits = ("1234567890" * (size // 10 + 1))[:size]
+    return f"(+ {digits} {digits})"
+
+
+def gen_unicode_ops(size: int) -> str:
+    # `size` expressions built only from the non ASCII operators
+    part = "(× (− a b) ((λ x (≜ y x (× y y))) a))"
+    return "(g " + " ".join([part] * size) + ")"
+
+
+# name -> (generator, default sizes, quick sizes)
+WORKLOADS = {
+    "realistic":   (gen_realistic,   [100, 400, 1600, 6400],         [50, 200, 800]),
+    "deep":        (gen_deep,        [100, 400, 1600, 6400],         [50, 200, 800]),
+    "wide_apply":  (gen_wide_apply,  [100, 400, 1600, 6400],         [50, 200, 800]),
+    "long_ident":  (gen_long_ident,  [1000, 10000, 100000, 1000000], [1000, 10000, 100000]),
+    "huge_number": (gen_huge_number, [100, 500, 1000, 4000],         [100, 1000, 4000]),
+    "unicode_ops": (gen_unicode_ops, [100, 400, 1600, 6400],         [50, 200, 800]),
+}
+
+# -----------------------
+# Measurement helpers
+
+# Runs fn repeatedly for at least min_time seconds and returns the best time
+# of a single call (best-of is less noisy than the mean on a busy machine),
+# if setup is given it runs untimed before every call and fn gets its result
+def _best_time(fn, min_time: float, setup=None) -> float:
+    best = math.inf
+    spent = 0.0
+    runs = 0
+    while spent < min_time or runs < 3:
+        arg = setup() if setup is not None else None
+        start = time.perf_counter()
+        fn(arg) if setup is not None else fn()
+        elapsed = time.perf_counter() - start
+        best = min(best, elapsed)
+        spent += elapsed
+        runs += 1
+    return best
+
+
+def _peak_memory(src: str, symbols=None) -> int:
+    tracemalloc.start()
+    try:
+        parse(Lexer.tokenize(src, symbols))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def measure(src: str, min_time: float, symbols=None) -> dict:
+    tokens = Lexer.tokenize(src, symbols)
+    encoded = treecodec.encode(parse(tokens))
+    tokenize_time = _best_time(lambda: Lexer.tokenize(src, symbols), min_time)
+    # fresh tokens for every run: long NUMBER literals are converted (and cached
+    # on the token) when parse reads them, so reusing tokens would skip that cost
+    parse_time = _best_time(parse, min_time, setup=lambda: Lexer.tokenize(src, symbols))
+    decode_time = _best_time(lambda: treecodec.decode(encoded), min_time)
+    return {
+        "chars": len(src),
+        "tokens": len(tokens),
+        "tokenize_s": tokenize_time,
+        "parse_s": parse_time,
+        "tokens_per_sec": len(tokens) / tokenize_time,
+        "trees_per_sec": 1 / parse_time,
+        "decoded_per_sec": 1 / decode_time,
+        "encoded_bytes": len(encoded),
+        "peak_kib": _peak_memory(src, symbols) / 1024,
+    }
+
+
+def run_benchmarks(names, quick: bool, min_time: float, intern: bool = False) -> dict:
+    results = {}
+    # one table for the whole run, the way a long lived process would share it
+    symbols = SymbolTable() if intern else None
+    for name in names:
+        generator, sizes, quick_sizes = WORKLOADS[name]
+        print(f"{name}:")
+        print(f"  {'size':>8} {'chars':>9} {'tokens':>8} {'tokens/s':>12} {'trees/s':>10} "
+              f"{'decoded/s':>10} {'peak KiB':>10} {'slope':>6}")
+        previous = None
+        for size in (quick_sizes if quick else sizes):
+            r = measure(generator(size), min_time, symbols)
+            results[f"{name}/{size}"] = r
+
+            # growth of total time relative to growth of input since the previous size
+            slope = ""
+            if previous is not None:
+                t0 = previous["tokenize_s"] + previous["parse_s"]
+                t1 = r["tokenize_s"] + r["parse_s"]
+                slope = f"{math.log(t1 / t0) / math.log(r['chars'] / previous['chars']):.2f}"
+            previous = r
+
+            print(f"  {size:>8} {r['chars']:>9} {r['tokens']:>8} {r['tokens_per_sec']:>12,.0f} "
+                  f"{r['trees_per_sec']:>10,.1f} {r['decoded_per_sec']:>10,.1f} {r['peak_kib']:>10,.1f} {slope:>6}")
+    return results
+
+# Multi-megabyte NUMBER literals, these are too big for the default NumberPolicy
+# so they are timed separately:
+#  - reject:   tokenize with the default policy, which must fail fast
+#  - tokenize: tokenize with no digit limit (the literal stays a lazy source span)
+#  - convert:  reading the lazy token's value once (the chunked int conversion)
+DIGIT_RUN_SIZES = [1 << 20, 2 << 20, 4 << 20]
+DIGIT_RUN_QUICK_SIZES = [256 << 10, 1 << 20]
+
+
+def _reject_time(src: str) -> None:
+    try:
+        Lexer.tokenize(src)
+    except ValueError:
+        return
+    raise AssertionError("default NumberPolicy accepted a multi-megabyte literal")
+
+
+def run_digit_runs(quick: bool, min_time: float) -> dict:
+    results = {}
+    unlimited = NumberPolicy(max_digits=None)
+    print("digit_run:")
+    print(f"  {'digits':>8} {'reject ms':>10} {'tokenize ms':>12} {'convert s':>10}")
+    for size in (DIGIT_RUN_QUICK_SIZES if quick else DIGIT_RUN_SIZES):
+        src = gen_huge_number(size)
+        reject_time = _best_time(lambda: _reject_time(src), min_time)
+        tokenize_time = _best_time(lambda: Lexer.tokenize(src, numbers=unlimited), min_time)
+        # the value is cached on the token, so every run converts a fresh one
+        convert_time = _best_time(lambda token: token.value, min_time,
+                                  setup=lambda: Lexer.tokenize(src, numbers=unlimited)[2])
+
+        results[f"digit_run/{size}"] = {
+            "chars": len(src),
+            "reject_s": reject_time,
+            "tokenize_s": tokenize_time,
+            "convert_s": convert_time,
+        }
+        print(f"  {size:>8} {reject_time * 1000:>10.3f} {tokenize_time * 1000:>12.3f} {convert_time:>10.3f}")
+    return results
+
+# -----------------------
+# Baselines
+
+# metric -> True when bigger is better, for the workload rows (tokenize_s and
+# parse_s are not compared, they are the same measurement as the rates)
+COMPARED_METRICS = {
+    "tokens_per_sec": True,
+    "trees_per_sec": True,
+    "decoded_per_sec": True,
+    "peak_kib": False,
+}
+# the same for the digit_run/* rows from --digit-runs, times in seconds
+DIGIT_RUN_METRICS = {
+    "reject_s": False,
+    "tokenize_s": False,
+    "convert_s": False,
+}
+
+
+# rates and sizes with one decimal, the (sub-millisecond) digit run times with significant digits
+def _format_metric(value: float) -> str:
+    return f"{value:,.1f}" if abs(value) >= 100 else f"{value:.4g}"
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list[str]:
+    regressions = []
+    for key, base in baseline.items():
+        now = current.get(key)
+        if now is None:
+            continue
+        metrics = DIGIT_RUN_METRICS if key.startswith("digit_run/") else COMPARED_METRICS
+        for metric, higher_is_better in metrics.items():
+            if metric not in base:
+                continue  # baseline saved before this metric existed
+            if higher_is_better:
+                change = now[metric] / base[metric] - 1
+                regressed = change < -threshold
+            else:
+                change = now[metric] / base[metric] - 1 if base[metric] else 0.0
+                regressed = change > threshold
+            if regressed:
+                regressions.append(f"{key} {metric}: {_format_metric(base[metric])} -> "
+                                   f"{_format_metric(now[metric])} ({change:+.1%})")
+    return regressions
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Benchmark Lexer.tokenize and parse.")
+    ap.add_argument("--workloads", nargs="*", choices=list(WORKLOADS), default=list(WORKLOADS))
+    ap.add_argument("--digit-runs", action="store_true", help="also time multi-megabyte NUMBER literals")
+    ap.add_argument("--quick", action="store_true", help="use the smaller size list")
+    ap.add_argument("--min-time", type=float, default=0.2, help="seconds spent timing each measurement")
+    ap.add_argument("--intern", action="store_true", help="tokenize with a shared SymbolTable")
+    ap.add_argument("--save", metavar="PATH", help="save results as a baseline JSON file")
+    ap.add_argument("--compare", metavar="PATH", help="compare against a saved baseline")
+    ap.add_argument("--threshold", type=float, default=0.15,
+                    help="allowed relative slowdown/memory growth before failing (default: 0.15)")
+    args = ap.parse_args(argv)
+
+    results = run_benchmarks(args.workloads, args.quick, args.min_time, args.intern)
+    if args.digit_runs:
+        results.update(run_digit_runs(args.quick, args.min_time))
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"python": platform.python_version(), "results": results}, f, indent=2)
+        print(f"\nBaseline written to {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(baseline, results, args.threshold)
+        print()
+        if regressions:
+            print(f"Regressions beyond {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%} against {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+# Command-line batch mode
+#
+# Parses many sources in one process (or a pool of them) and writes one JSON
+# result per input line, this is how batch jobs should call the parser.
+#
+# Input (files or stdin, "-" means stdin):
+#  - default: one source per line
+#  - --jsonl: one JSON request per line, either a string or {"id": ..., "src": ...}
+#
+# Output (one line per input line, same order):
+#   {"tree": ["PLUS", 2, 3], "error": null}
+#   {"id": 7, "tree": null, "error": "SyntaxError: ..."}    (id only if given)
+#
+# Examples:
+#   python3 cli.py sources.txt > trees.jsonl
+#   python3 cli.py --jsonl --workers 4 --stats requests.jsonl -o trees.jsonl
+#
+# Only argparse and sys are imported up front, the parser, json and
+# multiprocessing are imported once we know they are needed.
+
+
+import argparse
+import sys
+
+DEFAULT_CHUNK_LINES = 2000
+OUTPUT_BUFFER_BYTES = 1 << 20
+
+
+# Parses one chunk of raw input lines and returns (output bytes, line count,
+# error count, input bytes), runs in the worker processes when --workers > 1
+def _process_chunk(lines: list[bytes], jsonl: bool):
+    from batch import decode_request, encode_result, format_response, parse_one
+
+    out = []
+    errors = 0
+    for raw in lines:
+        line = raw.decode("utf-8", errors="replace").rstrip("\r\n")
+        req_id = None
+        if jsonl:
+            req_id, src, encoded = decode_request(line)
+        else:
+            src, encoded = line, None
+
+        if encoded is None:
+            result = parse_one(src)
+            encoded = encode_result(result)
+            if result["error"] is not None:
+                errors += 1
+        else:
+            errors += 1
+
+        out.append(format_response(encoded, req_id))
+
+    out.append("")
+    return "\n".join(out).encode("utf-8"), len(lines), errors, sum(len(raw) for raw in lines)
+
+
+# Yields lists of raw lines from every input, chunk_lines at a time
+def _read_chunks(paths, chunk_lines):
+    from itertools import islice
+
+    for path in paths:
+        f = sys.stdin.buffer if path == "-" else open(path, "rb")
+        try:
+            while True:
+                chunk = list(islice(f, chunk_lines))
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            if f is not sys.stdin.buffer:
+                f.close()
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Parse sources in bulk and write one JSON result per line.")
+    ap.add_argument("inputs", nargs="*", default=["-"], help="input files (default: stdin)")
+    ap.add_argument("-o", "--output", default="-", help="output file (default: stdout)")
+    ap.add_argument("--jsonl", action="store_true", help="inputs are JSON lines instead of raw sources")
+    ap.add_argument("--workers", type=int, default=1, help="number of worker processes (default: 1)")
+    ap.add_argument("--chunk-lines", type=int, default=DEFAULT_CHUNK_LINES,
+                    help="lines handed to a worker at a time")
+    ap.add_argument("--stats", action="store_true", help="print throughput to stderr when done")
+    args = ap.parse_args(argv)
+
+    if args.stats:
+        import time
+        start = time.perf_counter()
+
+    if args.output == "-":
+        out = open(sys.stdout.fileno(), "wb", buffering=OUTPUT_BUFFER_BYTES, closefd=False)
+    else:
+        out = open(args.output, "wb", buffering=OUTPUT_BUFFER_BYTES)
+
+    counts = {"lines": 0, "errors": 0, "in_bytes": 0}
+
+    def consume(results):
+        for data, lines, errors, in_bytes in results:
+            counts["lines"] += lines
+            counts["errors"] += errors
+            counts["in_bytes"] += in_bytes
+            out.write(data)
+
+    try:
+        if args.workers > 1:
+            import multiprocessing
+            from functools import partial
+
+            chunks = _read_chunks(args.inputs, args.chunk_lines)
+            with multiprocessing.Pool(args.workers) as pool:
+                # imap keeps the output in input order while workers run ahead
+                consume(pool.imap(partial(_process_chunk, jsonl=args.jsonl), chunks))
+        else:
+            chunks = _read_chunks(args.inputs, args.chunk_lines)
+            consume(_process_chunk(chunk, args.jsonl) for chunk in chunks)
+    finally:
+        out.close()
+
+    if args.stats:
+        elapsed = time.perf_counter() - start
+        lines = counts["lines"]
+        rate = lines / elapsed if elapsed > 0 else 0.0
+        mb_rate = counts["in_bytes"] / (1 << 20) / elapsed if elapsed > 0 else 0.0
+        print(f"Lines: {lines} | Trees: {lines - counts['errors']} | Errors: {counts['errors']} | "
+              f"Elapsed: {elapsed:.3f}s | Throughput: {rate:,.0f} lines/s ({mb_rate:.2f} MB/s)",
+              file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
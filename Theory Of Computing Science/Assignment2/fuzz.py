@@ -0,0 +1,349 @@
+# Grammar-driven program generator and differential fuzzer
+#
+# What this file does:
+#  - walks GRAMMAR to generate random valid programs of a controlled size/depth
+#  - mutates valid programs (delete/duplicate/swap/insert/truncate/long number) to get invalid ones
+#  - runs every available lexer/parser backend on each program and stops at the
+#    first program where the trees or error messages differ
+#  - with --emit, just prints generated programs one per line, which makes it a
+#    workload source for cli.py/loadgen.py throughput tests
+#
+# Backends (see BACKENDS below):
+#  - reference: Lexer.tokenize + parse from Assignment2.py in this folder
+#  - desktop:   the lexer from Desktop/Assignment2.py (that copy has no parser,
+#               so its tokens are converted by name and fed to the reference parse)
+#  - codec:     the reference tree after a round trip through treecodec
+#  - interned:  the reference lexer/parser with one SymbolTable shared by every program
+#
+# Examples:
+#   python3 fuzz.py --count 20000 --seed 7
+#   python3 fuzz.py --backends reference,codec,interned
+#   python3 fuzz.py --emit 100000 --max-nodes 40 > programs.txt
+
+
+import argparse
+import importlib.util
+import random
+import sys
+from pathlib import Path
+
+import Assignment2
+import treecodec
+from Assignment2 import DEFAULT_NUMBER_POLICY, GRAMMAR, SINGLE, Lexer, SymbolTable, Token, TokenType, parse
+
+DESKTOP_SOURCE = Path(__file__).resolve().parents[2] / "Desktop" / "Assignment2.py"
+
+# -----------------------
+# Program generator
+
+# TokenType -> the character the lexer reads for it
+TERMINAL_TEXT = {ttype: ch for ch, ttype in SINGLE.items()}
+
+# non terminal -> production numbers, and the productions that end a branch
+# without adding more nesting (used once the size or depth budget runs out)
+PRODUCTIONS: dict[str, list[int]] = {}
+for _number, (_lhs, _rhs) in GRAMMAR.items():
+    PRODUCTIONS.setdefault(_lhs, []).append(_number)
+TERMINATING = {
+    lhs: [n for n in numbers if not any(isinstance(sym, str) for sym in GRAMMAR[n][1])]
+    for lhs, numbers in PRODUCTIONS.items()
+}
+
+
+def _random_ident(rng: random.Random) -> str:
+    letters = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    length = rng.choice([1, 1, 2, 3, 5, 8])
+    tail = "".join(rng.choice(letters + "0123456789") for _ in range(length - 1))
+    return rng.choice(letters) + tail
+
+
+# NUMBER literal lengths where the lexer changes behaviour: the last eager and
+# first lazy literal, the last single int() call and first chunked conversion,
+# and the longest literal the default NumberPolicy accepts
+BOUNDARY_DIGITS = (
+    DEFAULT_NUMBER_POLICY.eager_digits,
+    DEFAULT_NUMBER_POLICY.eager_digits + 1,
+    Assignment2._INT_CHUNK_DIGITS,
+    Assignment2._INT_CHUNK_DIGITS + 1,
+    DEFAULT_NUMBER_POLICY.max_digits,
+)
+# lengths the default NumberPolicy rejects, used by the "long number" mutation
+TOO_LONG_DIGITS = (DEFAULT_NUMBER_POLICY.max_digits + 1, 5000)
+
+
+def _digits(rng: random.Random, length: int) -> str:
+    return rng.choice("123456789") + "".join(rng.choice("0123456789") for _ in range(length - 1))
+
+
+def _random_number(rng: random.Random, boundary: float = 0.02) -> str:
+    if rng.random() < boundary:
+        return _digits(rng, rng.choice(BOUNDARY_DIGITS))
+    return str(rng.choice([0, 1, 2, rng.randint(0, 100), rng.randint(0, 10 ** rng.randint(1, 60))]))
+
+
+# Expands the start symbol into a list of token texts, iteratively so deep
+# programs do not hit the recursion limit
+def generate_pieces(rng: random.Random, max_depth: int = 8, max_nodes: int = 40,
+                    nest: float = 0.6, wide: float = 0.35) -> list[str]:
+    pieces = []
+    nodes = 0
+    stack = [("S", 0)]  # (symbol, nesting depth)
+
+    while stack:
+        symbol, depth = stack.pop()
+
+        if isinstance(symbol, TokenType):
+            if symbol == TokenType.NUMBER:
+                pieces.append(_random_number(rng))
+            elif symbol == TokenType.IDENT:
+                pieces.append(_random_ident(rng))
+            else:
+                pieces.append(TERMINAL_TEXT[symbol])
+            continue
+
+        exhausted = depth >= max_depth or nodes >= max_nodes
+        if symbol == "E'":
+            # E' -> E E' keeps an APPLY growing, E' -> ε ends it
+            number = 13 if not exhausted and rng.random() < wide else 14
+        elif exhausted and TERMINATING[symbol]:
+            number = rng.choice(TERMINATING[symbol])
+        elif symbol == "E":
+            # E -> ( P ) with probability `nest` (always for the outermost E so
+            # programs are rarely a single leaf), otherwise a NUMBER or IDENT leaf
+            number = 4 if nodes == 0 or rng.random() < nest else rng.choice(TERMINATING["E"])
+        else:
+            number = rng.choice(PRODUCTIONS[symbol])
+
+        if symbol == "E":
+            nodes += 1
+        rhs = GRAMMAR[number][1]
+        child_depth = depth + 1 if number == 4 else depth
+        for sym in reversed(rhs):
+            stack.append((sym, child_depth))
+
+    return pieces
+
+
+# Joins token texts with random whitespace, two word-like tokens always get at
+# least one space between them so they are not lexed as a single token
+def render(pieces: list[str], rng: random.Random, whitespace=(" ", " ", " ", "  ", "\t", "\n")) -> str:
+    out = []
+    previous = ""
+    for piece in pieces:
+        if previous and (previous[-1].isalnum() and piece[0].isalnum() or rng.random() < 0.7):
+            out.append(rng.choice(whitespace))
+        out.append(piece)
+        previous = piece
+    return "".join(out)
+
+
+# Characters used when inserting junk, includes the ASCII look-alikes the lexer rejects
+_JUNK = list(TERMINAL_TEXT.values()) + ["-", "*", "#", "0", "x", "é", ")", "("]
+
+
+def mutate(pieces: list[str], rng: random.Random) -> list[str]:
+    pieces = list(pieces)
+    kind = rng.choice(["delete", "duplicate", "swap", "insert", "truncate", "long_number"])
+    i = rng.randrange(len(pieces))
+    if kind == "delete" and len(pieces) > 1:
+        del pieces[i]
+    elif kind == "duplicate":
+        pieces.insert(i, pieces[i])
+    elif kind == "swap" and len(pieces) > 1:
+        j = min(i + 1, len(pieces) - 1) if i + 1 < len(pieces) else i - 1
+        pieces[i], pieces[j] = pieces[j], pieces[i]
+    elif kind == "truncate":
+        pieces = pieces[:i]
+    elif kind == "long_number":
+        # replaces a NUMBER literal with one that is too long (or adds one)
+        numbers = [j for j, piece in enumerate(pieces) if piece[0].isdigit()]
+        literal = _digits(rng, rng.choice(TOO_LONG_DIGITS))
+        if numbers:
+            pieces[rng.choice(numbers)] = literal
+        else:
+            pieces.insert(i, literal)
+    else:
+        pieces.insert(i, rng.choice(_JUNK))
+    return pieces
+
+
+def generate_program(rng: random.Random, invalid_ratio: float = 0.3, **limits) -> tuple[str, bool]:
+    pieces = generate_pieces(rng, **limits)
+    mutated = rng.random() < invalid_ratio
+    if mutated:
+        pieces = mutate(pieces, rng)
+    return render(pieces, rng), mutated
+
+# -----------------------
+# Backends
+#
+# A backend is a function src -> outcome, where the outcome is ("tree", tree) or
+# ("error", "<ExceptionType>: <message>") so different backends can be compared.
+
+def _outcome(fn, src):
+    try:
+        return ("tree", fn(src))
+    except Exception as e:
+        return ("error", f"{type(e).__name__}: {e}")
+
+
+def _reference(src):
+    return parse(Lexer.tokenize(src))
+
+
+def _codec(src):
+    return treecodec.decode(treecodec.encode(parse(Lexer.tokenize(src))))
+
+
+def _interned_backend():
+    # small enough that a long run fills it and also covers the tokens made
+    # once the table is full
+    symbols = SymbolTable(max_symbols=1000)
+
+    def run(src):
+        return parse(Lexer.tokenize(src, symbols))
+
+    return run
+
+
+def _load_module(name: str, path: Path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _desktop_backend():
+    if not DESKTOP_SOURCE.exists():
+        return None
+    desktop = _load_module("desktop_assignment2", DESKTOP_SOURCE)
+
+    def run(src):
+        # the two copies have separate TokenType enums, so convert by name
+        tokens = [Token(TokenType[t.type.name], t.value) for t in desktop.Lexer.tokenize(src)]
+        return parse(tokens)
+
+    run.module = desktop
+    return run
+
+
+def available_backends() -> dict:
+    backends = {"reference": _reference, "codec": _codec, "interned": _interned_backend()}
+    desktop = _desktop_backend()
+    if desktop is not None:
+        backends["desktop"] = desktop
+    return backends
+
+
+# Tables described by names only so copies with their own TokenType compare equal
+def _table_signature(module) -> dict:
+    def name(sym):
+        return sym.name if hasattr(sym, "name") else sym
+
+    return {
+        "SINGLE": {ch: t.name for ch, t in module.SINGLE.items()},
+        "GRAMMAR": {n: (lhs, [name(s) for s in rhs]) for n, (lhs, rhs) in module.GRAMMAR.items()},
+        "TABLE": {(nt, t.name): n for (nt, t), n in getattr(module, "TABLE", {}).items()},
+    }
+
+
+def compare_tables(backends: dict) -> list[str]:
+    reference = _table_signature(Assignment2)
+    problems = []
+    for backend_name, run in backends.items():
+        module = getattr(run, "module", None)
+        if module is None:
+            continue
+        other = _table_signature(module)
+        for table, entries in reference.items():
+            if other[table] != entries:
+                keys = sorted(set(entries) | set(other[table]), key=str)
+                first = next(k for k in keys if entries.get(k) != other[table].get(k))
+                problems.append(f"{backend_name}: {table}[{first!r}] is {other[table].get(first)!r}, "
+                                f"reference has {entries.get(first)!r}")
+    return problems
+
+# -----------------------
+# Running the fuzzer itself:
+
+# long literals would bury the rest of the report, --seed reproduces the full input
+def _shorten(text: str, limit: int = 300) -> str:
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit // 2]}...<{len(text)} chars>...{text[-limit // 2:]}"
+
+
+def fuzz(backends: dict, count: int, seed: int, invalid_ratio: float, **limits):
+    rng = random.Random(seed)
+    stats = {"programs": 0, "valid": 0, "errors": 0}
+    for _ in range(count):
+        src, mutated = generate_program(rng, invalid_ratio, **limits)
+        outcomes = {name: _outcome(run, src) for name, run in backends.items()}
+        stats["programs"] += 1
+        reference = outcomes["reference"]
+        if reference[0] == "tree":
+            stats["valid"] += 1
+        else:
+            stats["errors"] += 1
+        if not mutated and reference[0] != "tree":
+            # a generated (unmutated) program must always parse
+            return src, {"reference": reference, "generator": ("tree", "<valid program>")}, stats
+        if any(outcome != reference for outcome in outcomes.values()):
+            return src, outcomes, stats
+    return None, None, stats
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Generate programs from GRAMMAR and compare backends.")
+    ap.add_argument("--count", type=int, default=10000, help="programs to try (default: 10000)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--max-depth", type=int, default=8, help="max paren nesting depth")
+    ap.add_argument("--max-nodes", type=int, default=40, help="approx. expressions per program")
+    ap.add_argument("--invalid-ratio", type=float, default=0.3, help="share of mutated programs")
+    ap.add_argument("--emit", type=int, metavar="N", help="print N programs, one per line, and exit")
+    ap.add_argument("--backends", help="comma separated backends to compare (default: all available)")
+    args = ap.parse_args(argv)
+    limits = {"max_depth": args.max_depth, "max_nodes": args.max_nodes}
+
+    if args.emit is not None:
+        rng = random.Random(args.seed)
+        out = sys.stdout
+        for _ in range(args.emit):
+            pieces = generate_pieces(rng, **limits)
+            if rng.random() < args.invalid_ratio:
+                pieces = mutate(pieces, rng)
+            # no newlines inside a program, the output is one program per line
+            out.write(render(pieces, rng, whitespace=(" ", " ", " ", "  ", "\t")) + "\n")
+        return 0
+
+    backends = available_backends()
+    if args.backends is not None:
+        wanted = args.backends.split(",")
+        unknown = [name for name in wanted if name not in backends]
+        if unknown:
+            ap.error(f"unknown or unavailable backends: {', '.join(unknown)} "
+                     f"(available: {', '.join(backends)})")
+        if "reference" not in wanted:
+            wanted.insert(0, "reference")  # every backend is compared against it
+        backends = {name: backends[name] for name in wanted}
+    print(f"Backends: {', '.join(backends)}")
+    problems = compare_tables(backends)
+    for line in problems:
+        print(f"  [Table mismatch] {line}")
+
+    src, outcomes, stats = fuzz(backends, args.count, args.seed, args.invalid_ratio, **limits)
+    print(f"Programs: {stats['programs']} | Parsed: {stats['valid']} | Errors: {stats['errors']}")
+    if src is not None:
+        print("First divergence on input:")
+        print(f"  {_shorten(repr(src))}")
+        for name, outcome in outcomes.items():
+            print(f"  {name:>10}: {outcome[0]} {_shorten(repr(outcome[1]))}")
+        return 1
+    if problems:
+        return 1
+    print("No divergence found")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
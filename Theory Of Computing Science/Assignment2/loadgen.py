@@ -0,0 +1,111 @@
+# Load generator for server.py
+#
+# Opens a number of connections to a running parse server, pipelines requests
+# on each one and reports latency (p50/p99/max) and overall throughput.
+#
+# Example:
+#   python3 server.py --port 8765 &
+#   python3 loadgen.py --port 8765 --connections 8 --requests 5000 --window 64
+
+
+import argparse
+import asyncio
+import itertools
+import json
+import time
+from collections import deque
+
+# Unicode reference: × (U+00D7), λ (U+03BB), ≜ (U+225C), − (U+2212)
+SAMPLE_SOURCES = [
+    "42",
+    "(+ 2 3)",
+    "(+ (× 2 3) 4)",
+    "(? (= x 0) 1 0)",
+    "((λ x (+ x 1)) 5)",
+    "(≜ y 10 (− y 1))",
+    "(+ 2 3 4)",  # parse error, the server still has to answer it
+]
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = round(pct / 100 * (len(sorted_values) - 1))
+    return sorted_values[index]
+
+
+async def _run_connection(args, sources, latencies, counts):
+    if args.unix:
+        reader, writer = await asyncio.open_unix_connection(args.unix, limit=1 << 24)
+    else:
+        reader, writer = await asyncio.open_connection(args.host, args.port, limit=1 << 24)
+
+    window = asyncio.Semaphore(args.window)
+    # the server answers each connection in request order, so responses are
+    # matched by arrival order (rejected requests, e.g. lines over the size
+    # limit, come back without an "id")
+    sent_at = deque()
+
+    async def send():
+        for req_id, src in zip(range(args.requests), sources):
+            await window.acquire()
+            sent_at.append(time.perf_counter())
+            writer.write((json.dumps({"id": req_id, "src": src}, ensure_ascii=False) + "\n").encode("utf-8"))
+            await writer.drain()
+
+    async def receive():
+        for _ in range(args.requests):
+            line = await reader.readline()
+            if not line:
+                raise ConnectionError("server closed the connection early")
+            response = json.loads(line)
+            latencies.append(time.perf_counter() - sent_at.popleft())
+            if response.get("error") is not None:
+                counts["errors"] += 1
+            window.release()
+
+    await asyncio.gather(send(), receive())
+    writer.close()
+    await writer.wait_closed()
+
+
+async def _run(args):
+    if args.input:
+        with open(args.input, encoding="utf-8") as f:
+            base = [line.rstrip("\n") for line in f if line.strip()]
+    else:
+        base = SAMPLE_SOURCES
+
+    latencies: list[float] = []
+    counts = {"errors": 0}
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        _run_connection(args, itertools.cycle(base), latencies, counts)
+        for _ in range(args.connections)
+    ))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    total = len(latencies)
+    print(f"Requests: {total} | Error responses: {counts['errors']} | "
+          f"Elapsed: {elapsed:.3f}s | Throughput: {total / elapsed:,.0f} req/s")
+    print(f"Latency p50: {_percentile(latencies, 50) * 1000:.3f} ms | "
+          f"p99: {_percentile(latencies, 99) * 1000:.3f} ms | "
+          f"max: {_percentile(latencies, 100) * 1000:.3f} ms")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Load generator for the parse server.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--unix", metavar="PATH", help="connect to a Unix socket instead of TCP")
+    ap.add_argument("--connections", type=int, default=4)
+    ap.add_argument("--requests", type=int, default=1000, help="requests per connection")
+    ap.add_argument("--window", type=int, default=32, help="max in-flight requests per connection")
+    ap.add_argument("--input", metavar="FILE", help="file with one source per line (default: built-in samples)")
+    args = ap.parse_args(argv)
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+# Asyncio parse server
+#
+# Wraps Lexer.tokenize/parse behind a TCP or Unix socket so callers do not
+# need to start a new Python process for every request.
+#
+# Protocol is newline-delimited JSON, one object per line in each direction:
+#   request:   {"id": 7, "src": "(+ 1 2)"}   (a bare JSON string also works)
+#   response:  {"id": 7, "tree": ["PLUS", 1, 2], "error": null}
+#   on error:  {"id": 7, "tree": null, "error": "SyntaxError: ..."}
+# "id" is only in the response when the request had one (the same as cli.py), and
+# every line gets exactly one response, including blank or invalid ones
+#
+# How it works:
+#  - each connection can pipeline requests, responses come back in request order
+#  - requests from every connection go into one queue and are micro-batched
+#  - small batches are parsed straight away, large ones are sent to a process
+#    pool so the event loop is never blocked by a big input
+#  - backpressure: lines longer than --max-input-bytes are rejected, and when the
+#    queue (or a connection's pipeline) is full we stop reading from the socket
+
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from batch import decode_request, encode_result, format_error, format_response, parse_batch_encoded
+
+# -----------------------
+# Defaults (all of these can be changed from the command line)
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_BATCH_SIZE = 64          # max requests parsed together
+DEFAULT_BATCH_DELAY = 0.002      # seconds to wait for a batch to fill up
+DEFAULT_MAX_INPUT_BYTES = 1 << 20
+DEFAULT_MAX_QUEUE = 1024         # requests waiting for a batch (all connections)
+DEFAULT_MAX_PIPELINE = 256       # unanswered requests per connection
+DEFAULT_INLINE_LIMIT = 4096      # batches with fewer source chars than this skip the pool
+
+
+def _error_result(message: str) -> str:
+    return encode_result({"tree": None, "error": message})
+
+
+class ParseServer:
+    def __init__(self, workers=None, batch_size=DEFAULT_BATCH_SIZE, batch_delay=DEFAULT_BATCH_DELAY,
+                 max_input_bytes=DEFAULT_MAX_INPUT_BYTES, max_queue=DEFAULT_MAX_QUEUE,
+                 max_pipeline=DEFAULT_MAX_PIPELINE, inline_limit=DEFAULT_INLINE_LIMIT):
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.max_input_bytes = max_input_bytes
+        self.max_queue = max_queue
+        self.max_pipeline = max_pipeline
+        self.inline_limit = inline_limit
+
+        # these are created in start() so they belong to the running loop
+        self._queue = None
+        self._pool = None
+        self._pool_slots = None
+        self._server = None
+        self._tasks = set()
+        self._connections = {}  # connection handler task -> its writer
+
+    # Starts listening on either a Unix socket path or host/port
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT, path=None):
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        # forked workers would inherit client sockets and keep them open after
+        # we close them, so the pool is started with forkserver/spawn instead
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context("forkserver")
+        else:
+            context = multiprocessing.get_context("spawn")
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+        # two batches per worker keeps the pool busy without hoarding requests
+        self._pool_slots = asyncio.Semaphore(self.workers * 2)
+        self._spawn(self._batch_loop())
+
+        if path is not None:
+            self._server = await asyncio.start_unix_server(
+                self._handle_connection, path=path, limit=self.max_input_bytes)
+        else:
+            self._server = await asyncio.start_server(
+                self._handle_connection, host, port, limit=self.max_input_bytes)
+        return self._server
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            # closing the sockets ends each handler the same way a client
+            # disconnect does, requests already read are still answered
+            handlers = list(self._connections)
+            for writer in self._connections.values():
+                writer.close()
+            await asyncio.gather(*handlers, return_exceptions=True)
+            await self._server.wait_closed()
+        for task in list(self._tasks):
+            task.cancel()
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+
+    def _spawn(self, coro):
+        # keep a reference so the task is not garbage collected while running
+        task = asyncio.get_running_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    # -----------------------
+    # Connection handling
+
+    # Reads one request line, returns b"" at end of input and None when the
+    # line was longer than max_input_bytes (the rest of that line is dropped)
+    async def _read_line(self, reader):
+        oversized = False
+        while True:
+            try:
+                line = await reader.readuntil(b"\n")
+            except asyncio.IncompleteReadError as e:
+                # last line without a trailing newline
+                return None if oversized else e.partial
+            except asyncio.LimitOverrunError as e:
+                oversized = True
+                await reader.readexactly(e.consumed)
+                continue
+            return None if oversized else line
+
+    async def _handle_connection(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        task = asyncio.current_task()
+        self._connections[task] = writer
+        # futures for this connection in request order, bounded so one client
+        # cannot pile up unlimited unanswered requests
+        pending = asyncio.Queue(maxsize=self.max_pipeline)
+        write_task = self._spawn(self._write_loop(pending, writer))
+
+        try:
+            while True:
+                line = await self._read_line(reader)
+                if line is None:
+                    req_id, src, result = None, None, _error_result("ValueError: Input Too Large")
+                elif not line:
+                    break
+                else:
+                    req_id, src, result = decode_request(line.rstrip(b"\r\n"))
+
+                future = loop.create_future()
+                await pending.put((req_id, future))
+                if result is not None:
+                    future.set_result(result)
+                else:
+                    # waiting here is the backpressure: we stop reading this socket
+                    await self._queue.put((src, future))
+        except ConnectionError:
+            pass
+        finally:
+            await pending.put(None)
+            await write_task
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+            self._connections.pop(task, None)
+
+    async def _write_loop(self, pending, writer):
+        broken = False
+        while True:
+            item = await pending.get()
+            if item is None:
+                return
+            req_id, future = item
+            result = await future
+            if broken:
+                continue
+            try:
+                # results are already encoded JSON objects, we only splice the id in front
+                data = (format_response(result, req_id) + "\n").encode("utf-8")
+            except Exception as e:
+                # the request still gets exactly one response, just without its id
+                data = (_error_result(f"ValueError: Bad Response: {format_error(e)}") + "\n").encode("utf-8")
+            try:
+                writer.write(data)
+                # only drain once the pipelined responses ready so far are written
+                if pending.empty():
+                    await writer.drain()
+            except Exception:
+                # client went away (or the transport failed), keep consuming so
+                # the reader side never blocks on a full pipeline
+                broken = True
+
+    # -----------------------
+    # Micro-batching
+
+    async def _batch_loop(self):
+        while True:
+            batch = [await self._queue.get()]
+            if self._queue.qsize() < self.batch_size - 1 and self.batch_delay > 0:
+                # give other pipelined requests a moment to join this batch
+                await asyncio.sleep(self.batch_delay)
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            total_chars = sum(len(src) for src, _ in batch)
+            if total_chars <= self.inline_limit:
+                # small enough that parsing here is cheaper than a pool round trip
+                self._finish_batch(batch, parse_batch_encoded([src for src, _ in batch]))
+            else:
+                await self._pool_slots.acquire()
+                self._spawn(self._run_in_pool(batch))
+
+    async def _run_in_pool(self, batch):
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(self._pool, parse_batch_encoded, [src for src, _ in batch])
+        except Exception as e:
+            # e.g. a worker process died, every request in the batch gets the error
+            results = [_error_result(format_error(e))] * len(batch)
+        finally:
+            self._pool_slots.release()
+        self._finish_batch(batch, results)
+
+    def _finish_batch(self, batch, results):
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
+# -----------------------
+# Running the server itself:
+
+async def _serve(args):
+    server = ParseServer(
+        workers=args.workers,
+        batch_size=args.batch_size,
+        batch_delay=args.batch_delay_ms / 1000,
+        max_input_bytes=args.max_input_bytes,
+        max_queue=args.max_queue,
+        max_pipeline=args.max_pipeline,
+        inline_limit=args.inline_limit,
+    )
+    listener = await server.start(host=args.host, port=args.port, path=args.unix)
+    where = args.unix if args.unix else f"{args.host}:{args.port}"
+    print(f"Parse server listening on {where} with {server.workers} worker(s)")
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        await server.close()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Newline-delimited JSON parse server.")
+    ap.add_argument("--host", default=DEFAULT_HOST)
+    ap.add_argument("--port", type=int, default=DEFAULT_PORT)
+    ap.add_argument("--unix", metavar="PATH", help="listen on a Unix socket instead of TCP")
+    ap.add_argument("--workers", type=int, default=None, help="process pool size (default: CPU count)")
+    ap.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    ap.add_argument("--batch-delay-ms", type=float, default=DEFAULT_BATCH_DELAY * 1000)
+    ap.add_argument("--max-input-bytes", type=int, default=DEFAULT_MAX_INPUT_BYTES)
+    ap.add_argument("--max-queue", type=int, default=DEFAULT_MAX_QUEUE)
+    ap.add_argument("--max-pipeline", type=int, default=DEFAULT_MAX_PIPELINE)
+    ap.add_argument("--inline-limit", type=int, default=DEFAULT_INLINE_LIMIT)
+    args = ap.parse_args(argv)
+
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
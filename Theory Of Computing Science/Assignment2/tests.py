@@ -1,16 +1,31 @@
 # Part C: Testing and Validation
 #
 # What this files does and outputs:
-#  - Runs the required positive and negative test cases
+#  - Runs the required positive and negative test cases, plus unit tests of internals
 #  - For each case, produces a JSON result file under ./outputs/
 #  - Each JSON includes: input, expected, actual (or error), and pass/fail
 #  - Prints a one-line summary for each test + overall stats
+#  - With --jsonl, all results go into one JSONL file instead (see run_consolidated),
+#    --workers shards the cases across processes and --incremental skips cases
+#    that have not changed since the last run
 
 
+import argparse
+import asyncio
+import hashlib
+import inspect
 import json
+import random
+import tempfile
+import threading
 from pathlib import Path
 
-from Assignment2 import Lexer, parse
+import batch
+import cli
+import server
+import treecodec
+from Assignment2 import (Lexer, LazyNumberToken, NumberPolicy, SymbolTable, Token, TokenType,
+                         _digits_to_int, parse)
 
 # -----------------------
 # Utilities for Input and also Output
@@ -24,6 +39,16 @@ def _write_json(path: Path, data) -> None:
     with path.open("w", encoding="utf-8") as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
 
+# Inputs longer than this are shortened in the result records so a huge test
+# input (e.g. a multi-megabyte literal) is not written out on every run
+MAX_RECORDED_INPUT = 1000
+
+
+def _record_input(src: str) -> str:
+    if len(src) <= MAX_RECORDED_INPUT:
+        return src
+    return f"{src[:100]}...<{len(src)} chars>"
+
 # -----------------------
 # Test definitions
 
@@ -79,11 +104,30 @@ POSITIVE_TESTS = [
         "src": "((λ x (+ x 1)) 5)",
         "expected_tree": ["APPLY", ["LAMBDA", "x", ["PLUS", "x", 1]], 5],
     },
+
+    # \\\ Long NUMBER literals (longer than 32 digits are converted lazily) ///
+    {
+        "name": "number_long_lazy",
+        "src": "(+ " + "1234567890" * 10 + " 1)",
+        "expected_tree": ["PLUS", int("1234567890" * 10), 1],
+    },
+    {
+        "name": "number_leading_zeros",
+        "src": "(+ 0042 " + "0" * 40 + "7)",
+        "expected_tree": ["PLUS", 42, 7],
+    },
+    {
+        "name": "number_max_digits",
+        "src": "9" * 4300,  # the longest literal the default NumberPolicy accepts
+        "expected_tree": int("9" * 4300),
+    },
 ]
 
 # Error tests split into two:
-#  - PARSE errors (expect SyntaxError with a meaningful message)
-#  - LEXER errors (expect ValueError with the "Incorrect Operator Used" message)
+#  - PARSE errors (expect SyntaxError with a meaningful message, optionally
+#    containing a given fragment)
+#  - LEXER errors (expect ValueError with the "Incorrect Operator Used" or
+#    "Number Literal Too Long" message)
 PARSE_ERROR_TESTS = [
     {
         "name": "err_missing_rparen",
@@ -103,6 +147,13 @@ PARSE_ERROR_TESTS = [
         "expect_error": "SyntaxError",
         "hint": "wrong number of arguments (detected at predictive step)",
     },
+    {
+        "name": "err_wrong_arity_long_number",
+        "src": "(+ 2 3 " + "5" * 40 + ")",
+        "expect_error": "SyntaxError",
+        "hint": "error message shows a lazily converted literal",
+        "expected_message_contains": "NUMBER(" + "5" * 40 + ")",
+    },
 ]
 
 LEXER_ERROR_TESTS = [
@@ -112,204 +163,839 @@ LEXER_ERROR_TESTS = [
         "expect_error": "ValueError",
         "expected_message_contains": "Incorrect Operator Used",
     },
+    {
+        "name": "err_number_too_long",
+        "src": "9" * 4301,  # one digit over the default limit
+        "expect_error": "ValueError",
+        "expected_message_contains": "Number Literal Too Long",
+    },
+    {
+        "name": "err_number_multi_megabyte",
+        "src": "(+ " + "9" * (2 << 20) + " 1)",  # must be rejected without converting it
+        "expect_error": "ValueError",
+        "expected_message_contains": "Number Literal Too Long",
+    },
 ]
 
-# -----------------------
-# Actual Test Code Implementation:
-
-# This function will run all the positive tests that compare actual parse tree with
-# with our expected tree, it will write a json result for each test and return a list of result summaries
-def run_positive_tests() -> list[dict]:
-    print("Running positive tests:")
-    results: list[dict] = []
-
-    for t in POSITIVE_TESTS:
-        name = t["name"]
-        src = t["src"]
-        expected_tree = t["expected_tree"]
-        result_path = OUT_DIR / f"{name}.json"
+# Unit tests cover what the data driven cases above cannot express: values too
+# long to be written to JSON, non default settings and internals. Each one is a
+# function that raises AssertionError when something is wrong.
+
+def _unit_number_policy_unlimited():
+    src = "7" * 10000
+    tokens = Lexer.tokenize(src, numbers=NumberPolicy(max_digits=None))
+    number = tokens[0]
+    assert isinstance(number, LazyNumberToken), f"expected a lazy token, got {number!r}"
+    assert len(number) == 10000, f"token covers {len(number)} digits"
+    assert number.value == (10 ** 10000 - 1) // 9 * 7, "wrong value for a 10000 digit literal"
+
+    # the default policy rejects the same literal, a small limit is exact
+    try:
+        Lexer.tokenize(src)
+    except ValueError as e:
+        assert "Number Literal Too Long" in str(e), f"unexpected message: {e}"
+    else:
+        raise AssertionError("default policy accepted a 10000 digit literal")
+    small = NumberPolicy(max_digits=5)
+    assert Lexer.tokenize("12345", numbers=small)[0].value == 12345
+    try:
+        Lexer.tokenize("123456", numbers=small)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("max_digits=5 accepted a 6 digit literal")
+
+
+def _unit_number_policy_eager_digits():
+    src = "(+ 5 " + "3" * 100 + ")"
+    expected_tree = ["PLUS", 5, int("3" * 100)]
+
+    def numbers(policy):
+        return [t for t in Lexer.tokenize(src, numbers=policy) if t.type == TokenType.NUMBER]
+
+    short, long = numbers(None)
+    assert type(short) is Token and isinstance(long, LazyNumberToken), "default: only the long literal is lazy"
+    short, long = numbers(NumberPolicy(eager_digits=0))
+    assert isinstance(short, LazyNumberToken) and isinstance(long, LazyNumberToken), "eager_digits=0: all lazy"
+    short, long = numbers(NumberPolicy(eager_digits=200))
+    assert type(short) is Token and type(long) is Token, "eager_digits=200: none lazy"
+    assert long.value == int("3" * 100), "wrong eagerly converted value"
+
+    # a larger eager_digits is capped, so int() never sees more digits than it may convert
+    policy = NumberPolicy(max_digits=None, eager_digits=10000)
+    number = Lexer.tokenize("8" * 5000, numbers=policy)[0]
+    assert isinstance(number, LazyNumberToken), "5000 digit literal was converted eagerly"
+    assert number.value == (10 ** 5000 - 1) // 9 * 8, "wrong value for a 5000 digit literal"
+
+    for policy in (None, NumberPolicy(eager_digits=0), NumberPolicy(eager_digits=200)):
+        tree = parse(Lexer.tokenize(src, numbers=policy))
+        assert tree == expected_tree, f"tree depends on eager_digits: {tree!r}"
+
+
+def _unit_digits_to_int_chunked():
+    rng = random.Random(2026)
+    for n in (4001, 9000, 12345):
+        digits = "000" + "".join(rng.choice("0123456789") for _ in range(n - 3))
+        # reference: fold 1000 digit pieces, each far below python's limit
+        expected = 0
+        for i in range(0, n, 1000):
+            piece = digits[i:i + 1000]
+            expected = expected * 10 ** len(piece) + int(piece)
+        assert _digits_to_int(digits) == expected, f"wrong value for {n} digits"
+
+
+# a parsed program using every node type, identifiers repeat so the string
+# table is shared
+_CODEC_SAMPLE = "(≜ f (λ x (? (= x 0) 1 (× x (f (− x 1))))) (f 5 y y))"
+
+
+def _unit_treecodec_round_trip():
+    trees = [
+        parse(Lexer.tokenize(_CODEC_SAMPLE)),
+        ["APPLY", "f"],
+        ["APPLY", "f", 0, 127, 128, 2 ** 63 - 1, 2 ** 63, 10 ** 100],
+        ["PLUS", "x", "x"],
+        "only_an_ident",
+        0,
+    ]
+    for tree in trees:
+        data = treecodec.encode(tree)
+        assert data.startswith(treecodec.MAGIC), "missing magic"
+        decoded = treecodec.decode(data)
+        assert decoded == tree, f"round trip changed {tree!r} into {decoded!r}"
+        assert treecodec.decode(memoryview(data)) == tree, "memoryview decode differs"
+
+    # deeper than the recursion limit, walked by hand because == on nested
+    # lists recurses as well
+    depth = 5000
+    tree = 1
+    for i in range(depth):
+        tree = ["PLUS", tree, i]
+    node = treecodec.decode(treecodec.encode(tree))
+    for i in reversed(range(depth)):
+        assert node[0] == "PLUS" and node[2] == i, f"wrong node at depth {depth - i}"
+        node = node[1]
+    assert node == 1, "wrong innermost value"
+
+
+def _unit_treecodec_rejects_corrupt():
+    data = treecodec.encode(parse(Lexer.tokenize(_CODEC_SAMPLE)))
+    tag_at = data.index(bytes([treecodec.NODE_TAGS["LET"][0]]), 4)
+
+    corrupt = {
+        "bad magic": b"JSON" + data[4:],
+        "empty": b"",
+        "unknown tag": data[:tag_at] + b"\x7f" + data[tag_at + 1:],
+        "trailing bytes": data + b"\x00",
+    }
+    for cut in range(len(data)):
+        corrupt[f"truncated to {cut} bytes"] = data[:cut]
 
+    for what, buf in corrupt.items():
+        try:
+            treecodec.decode(buf)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"decode accepted {what}")
+
+    # values that never come out of parse() are refused by the encoder
+    for tree in (-1, True, 1.5, None, [], ["PLUS", 1], ["FOO", 1, 2], ["LET", "x", 1]):
         try:
-            tokens = Lexer.tokenize(src)
-            tree = parse(tokens)
+            treecodec.encode(tree)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"encode accepted {tree!r}")
+
+
+def _unit_tree_cache():
+    src = _CODEC_SAMPLE
+    expected_tree = parse(Lexer.tokenize(src))
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache = treecodec.TreeCache(directory)
+        path = cache.path_for(src)
+        assert cache.load(src) is None, "empty cache returned a tree"
+        assert cache.get_or_parse(src) == expected_tree, "get_or_parse returned a wrong tree"
+        assert path.exists(), "get_or_parse did not store the tree"
+        assert cache.load(src) == expected_tree, "stored tree does not load back"
+
+        # an unreadable entry counts as missing and is replaced on the next parse
+        for garbage in (b"", b"MLT1\xff", b"not a tree at all"):
+            path.write_bytes(garbage)
+            assert cache.load(src) is None, f"corrupt entry {garbage!r} was loaded"
+            assert cache.get_or_parse(src) == expected_tree, "get_or_parse did not reparse"
+            assert cache.load(src) == expected_tree, "corrupt entry was not repaired"
+
+        # errors are raised as usual and nothing is stored for them
+        try:
+            cache.get_or_parse("(+ 2")
+        except SyntaxError:
+            pass
+        else:
+            raise AssertionError("get_or_parse accepted (+ 2")
+        assert not cache.path_for("(+ 2").exists(), "a parse error was cached"
+
+        # a different parser source gives different keys, so old entries are ignored
+        original = treecodec._parser_hash
+        treecodec._parser_hash = lambda: "0" * 64
+        try:
+            changed = treecodec.TreeCache(directory)
+        finally:
+            treecodec._parser_hash = original
+        assert changed.path_for(src) != path, "cache key does not depend on the parser"
+        assert changed.load(src) is None, "entry from another parser version was loaded"
+
+        # threads storing the same key each write their own temporary file
+        errors = []
+
+        def store_many():
+            try:
+                for _ in range(50):
+                    cache.store(src, expected_tree)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=store_many) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert not errors, f"concurrent store failed: {errors[0]!r}"
+        assert cache.load(src) == expected_tree, "entry is broken after concurrent stores"
+        assert not list(path.parent.glob("*.tmp")), "temporary files were left behind"
+
+
+def _unit_symbol_table():
+    symbols = SymbolTable()
+    converted = []
+
+    def convert(text):
+        converted.append(text)
+        return int(text)
+
+    a = symbols.intern("alpha")
+    n = symbols.intern("0042", convert)
+    assert (a, n) == (0, 1), f"ids are not handed out in order: {(a, n)}"
+    assert symbols.intern("alpha") == a and symbols.intern("0042", convert) == n, "same text got a new id"
+    assert converted == ["0042"], f"convert ran {len(converted)} times"
+    assert symbols.text(a) == "alpha" and symbols.value(a) == "alpha", "wrong IDENT entry"
+    assert symbols.text(n) == "0042" and symbols.value(n) == 42, "wrong NUMBER entry"
+    assert len(symbols) == 2, f"table has {len(symbols)} entries"
+
+
+def _unit_symbol_table_tokens():
+    symbols = SymbolTable()
+    big = "123456789012"  # not one of python's cached small ints
+    first = Lexer.tokenize(f"(+ total {big})", symbols)
+    second = Lexer.tokenize(f"(× {big} total)", symbols)
+
+    for token in first + second:
+        if token.type in (TokenType.IDENT, TokenType.NUMBER):
+            assert token.sym is not None, f"{token!r} has no symbol id"
+            assert token.value is symbols.value(token.sym), f"{token!r} does not share the table value"
+        else:
+            assert token.sym is None, f"{token!r} got a symbol id"
+    assert first[2].sym == second[3].sym and first[3].sym == second[2].sym, "same text got different ids"
+
+    # trees built from different inputs share the same objects
+    tree1, tree2 = parse(first), parse(second)
+    assert tree1 == ["PLUS", "total", int(big)] and tree2 == ["MULT", int(big), "total"], "wrong trees"
+    assert tree1[1] is tree2[2] and tree1[2] is tree2[1], "trees do not share interned values"
+
+    # long literals stay lazy and are not interned
+    lazy = Lexer.tokenize("7" * 40, symbols)[0]
+    assert isinstance(lazy, LazyNumberToken) and lazy.sym is None, "long literal was interned"
+
+
+def _unit_symbol_table_max_symbols():
+    symbols = SymbolTable(max_symbols=2)
+    tokens = Lexer.tokenize("(≜ a 1 (+ a b))", symbols)
+    assert len(symbols) == 2, f"table grew to {len(symbols)} entries"
+    assert symbols.intern("b") is None, "intern added text to a full table"
+    assert symbols.intern("a") == 0, "a full table lost an existing entry"
+
+    a, b = tokens[2], tokens[7]
+    assert a.sym == 0 and b.sym is None, f"wrong ids once full: {a.sym}, {b.sym}"
+    assert b.type == TokenType.IDENT and b.value == "b", f"wrong fallback token {b!r}"
+    assert parse(tokens) == ["LET", "a", 1, ["PLUS", "a", "b"]], "wrong tree with a full table"
+
+
+def _unit_request_id_surrogate():
+    # valid JSON, but the id decodes to a lone surrogate that UTF-8 cannot hold
+    line = '{"id": "\\ud800", "src": "(+ 2 3)"}'
+    req_id, src, error = batch.decode_request(line)
+    assert (req_id, src, error) == ("\ud800", "(+ 2 3)", None), "request was not decoded"
+    response = batch.format_response(batch.encode_result(batch.parse_one(src)), req_id)
+    assert json.loads(response.encode("utf-8")) == {"id": "\ud800", "tree": ["PLUS", 2, 3], "error": None}, \
+        f"wrong response {response!r}"
+
+    # the CLI answers it and keeps going with the next line
+    out, n_lines, errors, _ = cli._process_chunk([line.encode("utf-8") + b"\n", b'{"id": 2, "src": "7"}\n'], True)
+    records = [json.loads(record) for record in out.decode("utf-8").splitlines()]
+    assert (n_lines, errors) == (2, 0), f"wrong counts {(n_lines, errors)}"
+    assert [r["id"] for r in records] == ["\ud800", 2] and records[1]["tree"] == 7, f"wrong output {records!r}"
+
+
+def _unit_encode_tree_matches_json():
+    trees = [
+        parse(Lexer.tokenize(_CODEC_SAMPLE)),
+        parse(Lexer.tokenize("(+ " + "1234567890" * 10 + " 1)")),
+        [], [[]], [[], [[]]], 0, "x", None,
+        ["APPLY", 'quote"back\\slash', "tab\tnew\nline", "\u2212\u03bb\u00e9", "\x00\x1f"],
+    ]
+    for tree in trees:
+        expected = json.dumps(tree, ensure_ascii=False)
+        actual = batch.encode_tree(tree)
+        assert actual == expected, f"encode_tree gave {actual!r}, json.dumps gives {expected!r}"
+
+    for value in (True, 1.5, {"a": 1}, ("PLUS", 1, 2)):
+        try:
+            batch.encode_tree(["PLUS", value, 1])
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"encode_tree accepted {value!r}")
+
+    # an int too long to print becomes an error result instead of an exception
+    result = json.loads(batch.encode_result({"tree": ["PLUS", 10 ** 5000, 1], "error": None}))
+    assert result["tree"] is None and result["error"].startswith("ValueError"), f"wrong result {result!r}"
+
+
+def _unit_encode_tree_deep():
+    # json.dumps hits the recursion limit long before this depth
+    depth = 100000
+    tree = 1
+    for _ in range(depth):
+        tree = ["PLUS", tree, 2]
+    expected = '["PLUS", ' * depth + "1" + ", 2]" * depth
+    assert batch.encode_tree(tree) == expected, "wrong encoding of a deep tree"
+    result = batch.encode_result({"tree": tree, "error": None})
+    assert result == '{"tree": ' + expected + ', "error": null}', "wrong encoded result for a deep tree"
+
+
+def _unit_decode_request():
+    assert batch.decode_request('"(+ 1 2)"') == (None, "(+ 1 2)", None), "bare string request"
+    assert batch.decode_request('{"id": 7, "src": "x"}') == (7, "x", None), "request with an id"
+    assert batch.decode_request('{"src": "x"}') == (None, "x", None), "request without an id"
+    assert batch.decode_request('{"id": 0, "src": "x"}') == (0, "x", None), "falsy id"
+
+    malformed = ["notjson", "", '{"id": 1', "[" * 100000, "42", '["src"]', '{"id": 1}', '{"src": 5}']
+    for line in malformed:
+        req_id, src, error = batch.decode_request(line)
+        assert req_id is None and src is None, f"{line[:20]!r} was accepted"
+        error = json.loads(error)
+        assert error["tree"] is None and error["error"].startswith("ValueError: Bad Request"), \
+            f"wrong error for {line[:20]!r}: {error!r}"
+
+    encoded = batch.encode_result(batch.parse_one("(+ 1 2)"))
+    assert batch.format_response(encoded) == encoded, "id-less response was changed"
+    assert batch.format_response(encoded, None) == encoded, "null id was added"
+    assert json.loads(batch.format_response(encoded, 0)) == {"id": 0, "tree": ["PLUS", 1, 2], "error": None}, \
+        "falsy id was dropped"
+    assert json.loads(batch.format_response(encoded, {"k": [1]}))["id"] == {"k": [1]}, "object id"
+
+
+# every line gets exactly one response, in request order
+_SERVER_REQUESTS = [
+    ('{"id": 1, "src": "(+ 1 2)"}', {"id": 1, "tree": ["PLUS", 1, 2], "error": None}),
+    ('"7"', {"tree": 7, "error": None}),
+    ("notjson", "ValueError: Bad Request"),
+    ("x" * 2048, "ValueError: Input Too Large"),
+    ("", "ValueError: Bad Request"),
+    ('{"src": "(+ 2"}', "SyntaxError"),
+    ('{"id": "\\ud800", "src": "1"}', {"id": "\ud800", "tree": 1, "error": None}),
+    ('{"id": 9, "src": "(\u00d7 2 3)"}', {"id": 9, "tree": ["MULT", 2, 3], "error": None}),
+]
 
-            if tree == expected_tree:
-                passed = True
-            else:
-                passed = False
-
-            result = {
-                "name": name,
-                "category": "positive",
-                "input": src,
-                "expected": expected_tree,
-                "actual": tree,
-                "passed": passed,
-                "error": None,
-            }
-
-            _write_json(result_path, result)
-
-            if passed:
-                print(f"  [Result: PASS] {name}")
-            else:
-                print(f"  [Result: FAIL] {name} -> tree does not match!")
-
-        except Exception as e:
-            # Any exception here is a failure of a positive test
-            result = {
-                "name": name,
-                "category": "positive",
-                "input": src,
-                "expected": expected_tree,
-                "actual": None,
-                "passed": False,
-                "error": f"{type(e).__name__}: {e}",
-            }
-            _write_json(result_path, result)
-            print(f"  [Result: ERROR] {name} -> {type(e).__name__}: {e}")
 
-        results.append(result)
+async def _server_round_trip() -> list[dict]:
+    # no request is large enough for the process pool, so no worker is started
+    parse_server = server.ParseServer(workers=1, max_input_bytes=1024, inline_limit=1 << 20, batch_delay=0)
+    listener = await parse_server.start(host="127.0.0.1", port=0)
+    try:
+        port = listener.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write("".join(line + "\n" for line, _ in _SERVER_REQUESTS).encode("utf-8"))
+        await writer.drain()
+        responses = []
+        for _ in _SERVER_REQUESTS:
+            responses.append(json.loads(await asyncio.wait_for(reader.readline(), 5)))
+        writer.close()
+        await writer.wait_closed()
+        return responses
+    finally:
+        await parse_server.close()
+
+
+def _unit_server_requests():
+    responses = asyncio.run(_server_round_trip())
+    for (line, expected), response in zip(_SERVER_REQUESTS, responses):
+        if isinstance(expected, dict):
+            assert response == expected, f"{line[:20]!r} got {response!r}"
+        else:
+            assert "id" not in response and response["tree"] is None, f"{line[:20]!r} got {response!r}"
+            assert response["error"].startswith(expected), f"{line[:20]!r} got {response['error']!r}"
+
+
+UNIT_TESTS = [
+    {
+        "name": "unit_number_policy_unlimited",
+        "hint": "max_digits=None accepts literals python cannot print, small limits are exact",
+    },
+    {
+        "name": "unit_number_policy_eager_digits",
+        "hint": "eager_digits decides which literals are lazy, the tree stays the same",
+    },
+    {
+        "name": "unit_digits_to_int_chunked",
+        "hint": "literals over 4000 digits are converted in chunks",
+    },
+    {
+        "name": "unit_treecodec_round_trip",
+        "hint": "encode/decode keep every node type, big numbers and very deep trees",
+    },
+    {
+        "name": "unit_treecodec_rejects_corrupt",
+        "hint": "bad magic, truncated data, unknown tags and trailing bytes raise ValueError",
+    },
+    {
+        "name": "unit_tree_cache",
+        "hint": "missing and unreadable entries are reparsed, a parser change invalidates entries",
+    },
+    {
+        "name": "unit_symbol_table",
+        "hint": "intern hands out one id per text, text/value look it up, convert runs once",
+    },
+    {
+        "name": "unit_symbol_table_tokens",
+        "hint": "interned tokens carry ids and trees share the interned objects",
+    },
+    {
+        "name": "unit_symbol_table_max_symbols",
+        "hint": "a full table stops growing and tokenize falls back to plain tokens",
+    },
+    {
+        "name": "unit_request_id_surrogate",
+        "hint": "an id that is not valid UTF-8 is escaped instead of crashing the CLI/server",
+    },
+    {
+        "name": "unit_encode_tree_matches_json",
+        "hint": "encode_tree output is the same as json.dumps(tree, ensure_ascii=False)",
+    },
+    {
+        "name": "unit_encode_tree_deep",
+        "hint": "encode_tree handles trees deeper than the recursion limit",
+    },
+    {
+        "name": "unit_decode_request",
+        "hint": "string/object requests, ids (including falsy ones) and malformed lines",
+    },
+    {
+        "name": "unit_server_requests",
+        "hint": "the server answers valid, malformed, oversized, blank and id-less lines in order",
+    },
+]
 
-    return results
+UNIT_CHECKS = {
+    "unit_number_policy_unlimited": _unit_number_policy_unlimited,
+    "unit_number_policy_eager_digits": _unit_number_policy_eager_digits,
+    "unit_digits_to_int_chunked": _unit_digits_to_int_chunked,
+    "unit_treecodec_round_trip": _unit_treecodec_round_trip,
+    "unit_treecodec_rejects_corrupt": _unit_treecodec_rejects_corrupt,
+    "unit_tree_cache": _unit_tree_cache,
+    "unit_symbol_table": _unit_symbol_table,
+    "unit_symbol_table_tokens": _unit_symbol_table_tokens,
+    "unit_symbol_table_max_symbols": _unit_symbol_table_max_symbols,
+    "unit_request_id_surrogate": _unit_request_id_surrogate,
+    "unit_encode_tree_matches_json": _unit_encode_tree_matches_json,
+    "unit_encode_tree_deep": _unit_encode_tree_deep,
+    "unit_decode_request": _unit_decode_request,
+    "unit_server_requests": _unit_server_requests,
+}
 
-# This function jhowever runs the parse error tests that will raise a syntax error
-def run_parse_error_tests() -> list[dict]:
-    print("Running parse-error tests:")
+# -----------------------
+# Actual Test Code Implementation:
+#
+# Each _check_* function runs a single case and returns (result, console line),
+# they do no file I/O so the same code is used by the serial runner below and by
+# the parallel JSONL runner (where they run inside worker processes).
+
+# Compares the actual parse tree of a positive test with the expected tree
+def _check_positive(t: dict) -> tuple[dict, str]:
+    name = t["name"]
+    src = t["src"]
+    expected_tree = t["expected_tree"]
+
+    try:
+        tokens = Lexer.tokenize(src)
+        tree = parse(tokens)
+
+        if tree == expected_tree:
+            passed = True
+        else:
+            passed = False
+
+        result = {
+            "name": name,
+            "category": "positive",
+            "input": _record_input(src),
+            "expected": expected_tree,
+            "actual": tree,
+            "passed": passed,
+            "error": None,
+        }
+
+        if passed:
+            line = f"  [Result: PASS] {name}"
+        else:
+            line = f"  [Result: FAIL] {name} -> tree does not match!"
+
+    except Exception as e:
+        # Any exception here is a failure of a positive test
+        result = {
+            "name": name,
+            "category": "positive",
+            "input": _record_input(src),
+            "expected": expected_tree,
+            "actual": None,
+            "passed": False,
+            "error": f"{type(e).__name__}: {e}",
+        }
+        line = f"  [Result: ERROR] {name} -> {type(e).__name__}: {e}"
+
+    return result, line
+
+# Checks that a parse error test raises a SyntaxError (with the expected message, if given)
+def _check_parse_error(t: dict) -> tuple[dict, str]:
+    name = t["name"]
+    src = t["src"]
+    expected_fragment = t.get("expected_message_contains", "")
+    expected = f"SyntaxError containing: {expected_fragment}" if expected_fragment else "SyntaxError"
+
+    try:
+        tokens = Lexer.tokenize(src)
+        _ = parse(tokens)
+
+        # If we get here, the input was accepted (unexpected)
+        result = {
+            "name": name,
+            "category": "parse_error",
+            "input": _record_input(src),
+            "expected": expected,
+            "actual": "ACCEPTED",
+            "passed": False,
+            "error": "Expected a SyntaxError, but parsing succeeded.",
+        }
+        line = f"  [Result: FAIL] {name} -> unexpectedly accepted"
+
+    except SyntaxError as e:
+        msg = str(e)
+        passed = expected_fragment in msg  # always true if no fragment specified
+
+        result = {
+            "name": name,
+            "category": "parse_error",
+            "input": _record_input(src),
+            "expected": expected,
+            "actual": "SyntaxError",
+            "passed": passed,
+            "error": msg,
+        }
+
+        if passed:
+            line = f"  [Result: PASS] {name} -> {msg}"
+        else:
+            line = f"  [Result: FAIL] {name} -> unexpected message: {msg}"
+
+    except Exception as e:
+        # Wrong error type
+        result = {
+            "name": name,
+            "category": "parse_error",
+            "input": _record_input(src),
+            "expected": expected,
+            "actual": type(e).__name__,
+            "passed": False,
+            "error": f"{type(e).__name__}: {e}",
+        }
+        line = f"  [Result: FAIL] {name} -> {type(e).__name__}: {e}"
+
+    return result, line
+
+# Checks that a lexer error test raises a ValueError with the expected message
+def _check_lexer_error(t: dict) -> tuple[dict, str]:
+    name = t["name"]
+    src = t["src"]
+    expected_fragment = t.get("expected_message_contains", "")
+
+    try:
+        tokens = Lexer.tokenize(src)
+        # If tokenize succeeds, then this is a failure for a lexer-error test
+        result = {
+            "name": name,
+            "category": "lexer_error",
+            "input": _record_input(src),
+            "expected": f"ValueError containing: {expected_fragment}",
+            "actual": "TOKENIZED",
+            "passed": False,
+            "error": "Expected a ValueError from the lexer, but tokenization succeeded.",
+        }
+        line = f"  [Result: FAIL] {name} -> tokenization unexpectedly succeeded"
+
+    except ValueError as e:
+        msg = str(e)
+        if expected_fragment and (expected_fragment in msg):
+            passed = True
+        else:
+            passed = (expected_fragment == "")  # if no fragment specified
+
+        result = {
+            "name": name,
+            "category": "lexer_error",
+            "input": _record_input(src),
+            "expected": f"ValueError containing: {expected_fragment}",
+            "actual": "ValueError",
+            "passed": passed,
+            "error": msg,
+        }
+
+        if passed:
+            line = f"  [Result: PASS] {name} -> {msg}"
+        else:
+            line = f"  [Result: FAIL] {name} -> unexpected message: {msg}"
+
+    except Exception as e:
+        # Wrong error type
+        result = {
+            "name": name,
+            "category": "lexer_error",
+            "input": _record_input(src),
+            "expected": "ValueError",
+            "actual": type(e).__name__,
+            "passed": False,
+            "error": f"{type(e).__name__}: {e}",
+        }
+        line = f"  [Result: FAIL] {name} -> {type(e).__name__}: {e}"
+
+    return result, line
+
+# Runs a unit test, any AssertionError it raises is a failure
+def _check_unit(t: dict) -> tuple[dict, str]:
+    name = t["name"]
+    check = UNIT_CHECKS[name]
+
+    try:
+        check()
+        result = {
+            "name": name,
+            "category": "unit",
+            "input": f"{check.__name__}()",
+            "expected": "no failed assertions",
+            "actual": "OK",
+            "passed": True,
+            "error": None,
+        }
+        line = f"  [Result: PASS] {name}"
+
+    except AssertionError as e:
+        result = {
+            "name": name,
+            "category": "unit",
+            "input": f"{check.__name__}()",
+            "expected": "no failed assertions",
+            "actual": "AssertionError",
+            "passed": False,
+            "error": f"{e}",
+        }
+        line = f"  [Result: FAIL] {name} -> {e}"
+
+    except Exception as e:
+        result = {
+            "name": name,
+            "category": "unit",
+            "input": f"{check.__name__}()",
+            "expected": "no failed assertions",
+            "actual": type(e).__name__,
+            "passed": False,
+            "error": f"{type(e).__name__}: {e}",
+        }
+        line = f"  [Result: ERROR] {name} -> {type(e).__name__}: {e}"
+
+    return result, line
+
+# category -> (test cases, check function, heading printed before the group)
+CATEGORIES = {
+    "positive": (POSITIVE_TESTS, _check_positive, "Running positive tests:"),
+    "parse_error": (PARSE_ERROR_TESTS, _check_parse_error, "Running parse-error tests:"),
+    "lexer_error": (LEXER_ERROR_TESTS, _check_lexer_error, "Running lexer-error tests:"),
+    "unit": (UNIT_TESTS, _check_unit, "Running unit tests:"),
+}
+
+# Runs every case of one category, writes a json result for each test and
+# returns a list of result summaries
+def _run_category(category: str) -> list[dict]:
+    cases, check, heading = CATEGORIES[category]
+    print(heading)
     results: list[dict] = []
 
-    for t in PARSE_ERROR_TESTS:
-        name = t["name"]
-        src = t["src"]
-        result_path = OUT_DIR / f"{name}.json"
-
-        try:
-            tokens = Lexer.tokenize(src)
-            _ = parse(tokens)
-
-            # If we get here, the input was accepted (unexpected)
-            result = {
-                "name": name,
-                "category": "parse_error",
-                "input": src,
-                "expected": "SyntaxError",
-                "actual": "ACCEPTED",
-                "passed": False,
-                "error": "Expected a SyntaxError, but parsing succeeded.",
-            }
-            _write_json(result_path, result)
-            print(f"  [Result: FAIL] {name} -> unexpectedly accepted")
-
-        except SyntaxError as e:
-            result = {
-                "name": name,
-                "category": "parse_error",
-                "input": src,
-                "expected": "SyntaxError",
-                "actual": "SyntaxError",
-                "passed": True,
-                "error": f"{e}",
-            }
-            _write_json(result_path, result)
-            print(f"  [Result: PASS] {name} -> {e}")
-
-        except Exception as e:
-            # Wrong error type
-            result = {
-                "name": name,
-                "category": "parse_error",
-                "input": src,
-                "expected": "SyntaxError",
-                "actual": type(e).__name__,
-                "passed": False,
-                "error": f"{type(e).__name__}: {e}",
-            }
-            _write_json(result_path, result)
-            print(f"  [Result: FAIL] {name} -> {type(e).__name__}: {e}")
-
+    for t in cases:
+        result, line = check(t)
+        _write_json(OUT_DIR / f"{t['name']}.json", result)
+        print(line)
         results.append(result)
 
     return results
 
+# This function will run all the positive tests that compare actual parse tree with
+# with our expected tree, it will write a json result for each test and return a list of result summaries
+def run_positive_tests() -> list[dict]:
+    return _run_category("positive")
+
+# This function jhowever runs the parse error tests that will raise a syntax error
+def run_parse_error_tests() -> list[dict]:
+    return _run_category("parse_error")
+
 # This is a special edge case to have some coverage regarding the testing of the lexer itself
 # here we run to see if an error occurs (e.g, invalid alphabet symbols) regarding the lexer in 
 # which a valueerror is raised
 def run_lexer_error_tests() -> list[dict]:
-    print("Running lexer-error tests:")
-    results: list[dict] = []
+    return _run_category("lexer_error")
 
-    for t in LEXER_ERROR_TESTS:
-        name = t["name"]
-        src = t["src"]
-        expected_fragment = t.get("expected_message_contains", "")
-        result_path = OUT_DIR / f"{name}.json"
+# Unit tests check the number policy and other internals directly
+def run_unit_tests() -> list[dict]:
+    return _run_category("unit")
 
-        try:
-            tokens = Lexer.tokenize(src)
-            # If tokenize succeeds, then this is a failure for a lexer-error test
-            result = {
-                "name": name,
-                "category": "lexer_error",
-                "input": src,
-                "expected": f"ValueError containing: {expected_fragment}",
-                "actual": "TOKENIZED",
-                "passed": False,
-                "error": "Expected a ValueError from the lexer, but tokenization succeeded.",
-            }
-            _write_json(result_path, result)
-            print(f"  [Result: FAIL] {name} -> tokenization unexpectedly succeeded")
-
-        except ValueError as e:
-            msg = str(e)
-            if expected_fragment and (expected_fragment in msg):
-                passed = True
-            else:
-                passed = (expected_fragment == "")  # if no fragment specified
-
-            result = {
-                "name": name,
-                "category": "lexer_error",
-                "input": src,
-                "expected": f"ValueError containing: {expected_fragment}",
-                "actual": "ValueError",
-                "passed": passed,
-                "error": msg,
-            }
-            _write_json(result_path, result)
-
-            if passed:
-                print(f"  [Result: PASS] {name} -> {msg}")
-            else:
-                print(f"  [Result: FAIL] {name} -> unexpected message: {msg}")
-
-        except Exception as e:
-            # Wrong error type
-            result = {
-                "name": name,
-                "category": "lexer_error",
-                "input": src,
-                "expected": "ValueError",
-                "actual": type(e).__name__,
-                "passed": False,
-                "error": f"{type(e).__name__}: {e}",
-            }
-            _write_json(result_path, result)
-            print(f"  [Result: FAIL] {name} -> {type(e).__name__}: {e}")
+# -----------------------
+# Consolidated runner (--jsonl):
+#  - cases are sharded across --workers processes
+#  - results are streamed into one JSONL file instead of one file per test
+#  - with --incremental, a case is skipped when its definition and the source
+#    files below are unchanged since the last run, its previous result is reused
+
+# the code under test plus this file (the check functions and shared fixtures
+# such as _CODEC_SAMPLE), a change to any of these re-runs every case
+HASHED_SOURCES = [
+    Path(__file__).with_name(name)
+    for name in ("Assignment2.py", "treecodec.py", "batch.py", "cli.py", "server.py", "tests.py")
+]
 
-        results.append(result)
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _case_hash(category: str, t: dict) -> str:
+    key = [category, t]
+    if category == "unit":
+        # a unit test is defined by its code rather than by data
+        key.append(inspect.getsource(UNIT_CHECKS[t["name"]]))
+    return _sha256(json.dumps(key, ensure_ascii=False, sort_keys=True).encode("utf-8"))
+
+
+def _run_case(job: tuple[str, dict]) -> tuple[dict, str]:
+    category, t = job
+    return CATEGORIES[category][1](t)
+
+
+# Loads the results of the previous consolidated run, keyed by case hash
+def _load_previous(path: Path) -> dict:
+    previous = {}
+    if not path.exists():
+        return previous
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # a run that was interrupted half way through a line
+            if "case_hash" in record:
+                previous[record["case_hash"]] = record
+    return previous
+
+
+def run_consolidated(results_path: Path, workers: int = 1, incremental: bool = False) -> dict[str, list[dict]]:
+    parser_hash = _sha256(b"".join(path.read_bytes() for path in HASHED_SOURCES))
+    previous = _load_previous(results_path) if incremental else {}
+
+    # work out which cases actually need to run
+    jobs = []
+    cached = {}
+    for category, (cases, _, _) in CATEGORIES.items():
+        for t in cases:
+            case_hash = _case_hash(category, t)
+            record = previous.get(case_hash)
+            if record is not None and record.get("parser_hash") == parser_hash:
+                cached[case_hash] = record
+            else:
+                jobs.append((category, t))
+
+    if workers > 1 and len(jobs) > 1:
+        import multiprocessing
+        pool = multiprocessing.Pool(workers)
+        # a few chunks per worker balances the load without much IPC
+        chunksize = max(1, len(jobs) // (workers * 4))
+        fresh = pool.imap(_run_case, jobs, chunksize=chunksize)
+    else:
+        pool = None
+        fresh = map(_run_case, jobs)
+
+    results: dict[str, list[dict]] = {category: [] for category in CATEGORIES}
+    try:
+        with results_path.open("w", encoding="utf-8") as f:
+            for category, (cases, _, heading) in CATEGORIES.items():
+                print(heading)
+                for t in cases:
+                    case_hash = _case_hash(category, t)
+                    record = cached.get(case_hash)
+                    if record is not None:
+                        status = "PASS" if record["passed"] else "FAIL"
+                        print(f"  [Result: {status}] {t['name']} (unchanged, skipped)")
+                    else:
+                        result, line = next(fresh)
+                        record = {**result, "case_hash": case_hash, "parser_hash": parser_hash}
+                        print(line)
+                    f.write(json.dumps(record, ensure_ascii=False))
+                    f.write("\n")
+                    results[category].append(record)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
 
     return results
 
 # -----------------------
 # Running the tests themselves: 
 
-def main():
-    pos_results = run_positive_tests()
-    perr_results = run_parse_error_tests()
-    lex_results = run_lexer_error_tests()
-
-    total = len(pos_results) + len(perr_results) + len(lex_results)
-    passed = sum(1 for r in pos_results + perr_results + lex_results if r["passed"])
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Run the Part C test cases.")
+    ap.add_argument("--jsonl", nargs="?", const=str(OUT_DIR / "results.jsonl"), default=None, metavar="PATH",
+                    help="write all results to one JSONL file (default: outputs/results.jsonl) "
+                         "instead of one JSON file per test")
+    ap.add_argument("--workers", type=int, default=1, help="worker processes for --jsonl (default: 1)")
+    ap.add_argument("--incremental", action="store_true",
+                    help="with --jsonl, skip cases unchanged since the last run")
+    args = ap.parse_args(argv)
+    if (args.workers > 1 or args.incremental) and args.jsonl is None:
+        ap.error("--workers and --incremental need --jsonl")
+
+    if args.jsonl is not None:
+        results = run_consolidated(Path(args.jsonl), workers=args.workers, incremental=args.incremental)
+        pos_results = results["positive"]
+        perr_results = results["parse_error"]
+        lex_results = results["lexer_error"]
+        unit_results = results["unit"]
+    else:
+        pos_results = run_positive_tests()
+        perr_results = run_parse_error_tests()
+        lex_results = run_lexer_error_tests()
+        unit_results = run_unit_tests()
+
+    all_results = pos_results + perr_results + lex_results + unit_results
+    total = len(all_results)
+    passed = sum(1 for r in all_results if r["passed"])
 
     # a summary JSON is written here (in case it is required, just being extra here)
     summary = {
@@ -320,14 +1006,18 @@ def main():
             "positive": sum(1 for r in pos_results if r["passed"]),
             "parse_errors": sum(1 for r in perr_results if r["passed"]),
             "lexer_errors": sum(1 for r in lex_results if r["passed"]),
+            "unit": sum(1 for r in unit_results if r["passed"]),
         },
     }
     _write_json(OUT_DIR / "summary.json", summary)
 
     print()
     print(f"Total: {total} | Passed: {passed} | Failed: {total - passed}")
-    print("Per-test JSON results written to ./outputs/")
+    if args.jsonl is not None:
+        print(f"JSONL results written to {args.jsonl}")
+    else:
+        print("Per-test JSON results written to ./outputs/")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,242 @@
+# Compact binary format for parse trees, plus an on-disk tree cache
+#
+# Format ("MLT1"):
+#   magic          b"MLT1"
+#   string table   varint count, then for each identifier: varint length + UTF-8 bytes
+#   nodes          the tree in pre-order, each node starts with a tag byte
+#
+#   tag  node      followed by
+#   0x00 NUMBER    varint value
+#   0x01 NUMBER    varint byte length + little-endian bytes (values >= 2**63)
+#   0x02 IDENT     varint index into the string table
+#   0x10 PLUS      2 children            0x14 COND    3 children
+#   0x11 MINUS     2 children            0x15 LAMBDA  2 children (IDENT, E)
+#   0x12 MULT      2 children            0x16 LET     3 children (IDENT, E, E)
+#   0x13 EQUALS    2 children            0x17 APPLY   varint child count, then children
+#
+# Varints are unsigned LEB128 (7 bits per byte, high bit set on all but the last).
+# Both the encoder and decoder use an explicit stack, so deeply nested trees do
+# not hit the recursion limit the way json and pickle do.
+#
+# TreeCache stores encoded trees keyed by a hash of the source text (and of the
+# parser source, so editing Assignment2.py invalidates old entries) and loads
+# them through mmap.
+
+
+import hashlib
+import mmap
+import os
+import tempfile
+from pathlib import Path
+
+from Assignment2 import Lexer, parse
+
+MAGIC = b"MLT1"
+
+TAG_NUMBER = 0x00
+TAG_BIG_NUMBER = 0x01
+TAG_IDENT = 0x02
+TAG_APPLY = 0x17
+
+# node name -> (tag, number of children), APPLY has a variable child count
+NODE_TAGS = {
+    "PLUS":   (0x10, 2),
+    "MINUS":  (0x11, 2),
+    "MULT":   (0x12, 2),
+    "EQUALS": (0x13, 2),
+    "COND":   (0x14, 3),
+    "LAMBDA": (0x15, 2),
+    "LET":    (0x16, 3),
+    "APPLY":  (TAG_APPLY, None),
+}
+# tag -> (node name, number of children)
+TAG_NODES = {tag: (name, arity) for name, (tag, arity) in NODE_TAGS.items()}
+
+_SMALL_NUMBER_LIMIT = 1 << 63
+
+
+def _write_varint(out: bytearray, n: int) -> None:
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _read_varint(buf, pos: int):
+    result = 0
+    shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+# -----------------------
+# Encoding
+
+def encode(tree) -> bytes:
+    strings: dict[str, int] = {}
+    body = bytearray()
+    stack = [tree]
+
+    while stack:
+        node = stack.pop()
+
+        # bool is a subclass of int but never appears in a parse tree
+        if isinstance(node, int) and not isinstance(node, bool) and node >= 0:
+            if node < _SMALL_NUMBER_LIMIT:
+                body.append(TAG_NUMBER)
+                _write_varint(body, node)
+            else:
+                raw = node.to_bytes((node.bit_length() + 7) // 8, "little")
+                body.append(TAG_BIG_NUMBER)
+                _write_varint(body, len(raw))
+                body += raw
+
+        elif isinstance(node, str):
+            index = strings.get(node)
+            if index is None:
+                index = strings[node] = len(strings)
+            body.append(TAG_IDENT)
+            _write_varint(body, index)
+
+        elif isinstance(node, list) and node and node[0] in NODE_TAGS:
+            tag, arity = NODE_TAGS[node[0]]
+            children = node[1:]
+            if arity is None:
+                body.append(tag)
+                _write_varint(body, len(children))
+            elif len(children) == arity:
+                body.append(tag)
+            else:
+                raise ValueError(f"Cannot encode {node[0]} node with {len(children)} children")
+            stack.extend(reversed(children))
+
+        else:
+            raise ValueError(f"Cannot encode tree value {node!r}")
+
+    out = bytearray(MAGIC)
+    _write_varint(out, len(strings))
+    for name in strings:  # dicts keep insertion order, which is the index order
+        raw = name.encode("utf-8")
+        _write_varint(out, len(raw))
+        out += raw
+    out += body
+    return bytes(out)
+
+# -----------------------
+# Decoding
+
+def decode(buf):
+    # buf can be bytes, a memoryview or an mmap, anything indexable by byte
+    if bytes(buf[:4]) != MAGIC:
+        raise ValueError("Not an encoded parse tree")
+    try:
+        return _decode_body(buf)
+    except IndexError:
+        raise ValueError("Truncated tree data") from None
+
+
+def _decode_body(buf):
+    end = len(buf)
+    count, pos = _read_varint(buf, 4)
+    strings = []
+    for _ in range(count):
+        length, pos = _read_varint(buf, pos)
+        strings.append(bytes(buf[pos:pos + length]).decode("utf-8"))
+        pos += length
+
+    # each stack entry is [node being filled, children still missing]
+    root = []
+    stack = [[root, 1]]
+    while stack:
+        if pos >= end:
+            raise ValueError("Truncated tree data")
+        tag = buf[pos]
+        pos += 1
+        children = 0
+
+        if tag == TAG_NUMBER:
+            value, pos = _read_varint(buf, pos)
+        elif tag == TAG_IDENT:
+            index, pos = _read_varint(buf, pos)
+            value = strings[index]
+        elif tag == TAG_BIG_NUMBER:
+            length, pos = _read_varint(buf, pos)
+            value = int.from_bytes(buf[pos:pos + length], "little")
+            pos += length
+        else:
+            entry = TAG_NODES.get(tag)
+            if entry is None:
+                raise ValueError(f"Unknown tag byte 0x{tag:02x}")
+            name, children = entry
+            if children is None:
+                children, pos = _read_varint(buf, pos)
+            value = [name]
+
+        top = stack[-1]
+        top[0].append(value)
+        top[1] -= 1
+        if top[1] == 0:
+            stack.pop()
+        if children:
+            stack.append([value, children])
+
+    if pos != end:
+        raise ValueError("Trailing bytes after tree data")
+    return root[0]
+
+# -----------------------
+# On-disk cache
+
+def _parser_hash() -> str:
+    return hashlib.sha256(Path(__file__).with_name("Assignment2.py").read_bytes()).hexdigest()
+
+
+class TreeCache:
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._salt = (MAGIC.decode("ascii") + _parser_hash()).encode("ascii")
+
+    def path_for(self, src: str) -> Path:
+        key = hashlib.sha256(self._salt + src.encode("utf-8")).hexdigest()
+        return self.directory / key[:2] / (key[2:] + ".mlt")
+
+    # Returns the cached tree for src, or None when it is not cached (or the
+    # entry is unreadable, which is treated the same as missing)
+    def load(self, src: str):
+        path = self.path_for(src)
+        try:
+            with path.open("rb") as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    return decode(mm)
+        except (OSError, ValueError):
+            return None
+
+    def store(self, src: str, tree) -> None:
+        path = self.path_for(src)
+        data = encode(tree)
+        path.parent.mkdir(exist_ok=True)
+        # write to a temporary file first so readers never see half an entry,
+        # its name is unique so concurrent stores (threads or processes) of the
+        # same key never write to the same file
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    # Loads the tree from the cache or parses src and stores the result, lexer
+    # and parser errors are raised as usual and are not cached
+    def get_or_parse(self, src: str):
+        tree = self.load(src)
+        if tree is None:
+            tree = parse(Lexer.tokenize(src))
+            self.store(src, tree)
+        return tree